@@ -1,20 +1,21 @@
 
 import datetime
 import os
+import random
+import string
 import uuid
 from functools import wraps
 from urllib.parse import unquote, quote
 import re
-import html
 import unicodedata
 from flask import request
 import firebase_admin
 import jwt
 import requests
-from bs4 import BeautifulSoup
 from firebase_admin import credentials, auth, messaging
-from flask import Flask, Response, request, jsonify, send_from_directory, session
+from flask import Flask, Response, request, jsonify, make_response, send_file, send_from_directory, session
 from flask_cors import CORS
+from sqlalchemy.orm import load_only
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 
@@ -23,13 +24,30 @@ from models import (
     Ticket, TicketMessage, TicketAttachment,
     User, Teacher, VerificationLog,
     Schedule, ScheduleTeacher, DeviceToken,
-    Notification
+    Notification, NewsArticle, news_search_index
 )
+from auth_cache import AuthCache
+from cache_invalidation import invalidation_bus
+from group_catalog import group_catalog
+from image_cache import ImageDiskCache
+from image_resize import (
+    ImageVariantError, UNREADABLE_IMAGE_ERRORS, parse_variant_args, variant_name, render_image_variant, resize_pool
+)
+from news_cache import StaleWhileRevalidateCache, ContentBlocksCache
+from news_crawler import NewsFetchError, fetch_news_page, fetch_news_detail, store_news_detail
+from news_parser import parse_news_detail_for_mobile, CONTENT_BLOCKS_VERSION
+from profile_cache import ProfileCache, build_profile
+from schedule_query import parse_schedule_range, fetch_schedule_page, serialize_lesson
+from schedule_snapshots import body_etag, get_week_snapshots
+from teacher_index import teacher_index
+from upstream import SingleFlight, Prefetcher, CircuitBreaker, upstream_get, breaker_for, breaker_stats, is_allowed_url
+from user_directory import serialize_directory, parse_fields, like_prefix
+from username_allocator import save_with_unique_username
 
 # === Configuration & Initialization === #
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 app.config.from_object('config')
 
@@ -42,6 +60,9 @@ os.makedirs(TICKET_ATTACHMENTS_FOLDER, exist_ok=True)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
 db.init_app(app)
+invalidation_bus.init_app(app)
+teacher_index.init_app(app)
+group_catalog.init_app(app)
 
 # Firebase initialization block
 FIREBASE_AVAILABLE = False
@@ -108,9 +129,8 @@ def token_required(f):
             return jsonify({'message': 'Token is missing'}), 401
 
         try:
-            payload = jwt.decode(token, app.config.get('SECRET_KEY'), algorithms=['HS256'])
-            user_id = payload['sub']
-            current_user = User.query.get(user_id)
+            # Read-only UserSnapshot; endpoints that change the user load it with db.session.get
+            current_user = auth_cache.get_user(token, app.config.get('SECRET_KEY'))
 
             if not current_user:
                 return jsonify({'message': 'User not found'}), 401
@@ -128,6 +148,26 @@ def token_required(f):
     return decorated
 
 
+auth_cache = AuthCache(
+    ttl=app.config['AUTH_CACHE_TTL'],
+    max_size=app.config['AUTH_CACHE_MAX_SIZE'],
+)
+invalidation_bus.register('user', auth_cache.invalidate_user)
+
+profile_cache = ProfileCache(
+    ttl=app.config['PROFILE_CACHE_TTL'],
+    max_size=app.config['PROFILE_CACHE_MAX_SIZE'],
+)
+invalidation_bus.register('user', profile_cache.invalidate_user)
+invalidation_bus.register('teachers', profile_cache.invalidate_teacher)
+invalidation_bus.register('group_info', profile_cache.invalidate_all)
+
+
+def load_current_user(current_user):
+    """Returns the ORM User behind a token_required snapshot, for endpoints that modify it."""
+    return db.session.get(User, current_user.id)
+
+
 def create_token(user_id):
     """Creates a JWT authentication token."""
     payload = {
@@ -222,157 +262,14 @@ def generate_username(full_name, group=None, role=None, department=None):
 
 # === News & Image Proxy === #
 
-def clean_text(text):
-    """Cleans text from invisible characters and excess whitespace."""
-    if not text:
-        return ""
-    text = re.sub(r'[\u200B-\u200D\uFEFF]', '', text)
-    text = html.unescape(text)
-    text = text.replace('\u200b', '')
-    return text.strip()
-
-
-def process_text_with_formatting(html_text):
-    """Processes HTML text, preserving basic formatting (bold, italic)."""
-    if not html_text:
-        return ""
-    if not isinstance(html_text, str):
-        html_text = str(html_text)
-    html_text = re.sub(r'<span class="image-marker"[^>]*>.*?</span>', '', html_text)
-    html_text = re.sub(r'<(strong|b)>(.*?)</(strong|b)>', r'**\2**', html_text, flags=re.DOTALL)
-    html_text = re.sub(r'<(em|i)>(.*?)</(em|i)>', r'_\2_', html_text, flags=re.DOTALL)
-    html_text = re.sub(r'<[^>]+>', '', html_text)
-    html_text = html.unescape(html_text)
-    html_text = re.sub(r'\s+', ' ', html_text).strip()
-    return html_text
-
-
-def parse_news_detail_for_mobile(html_content):
-    """Parses news HTML content into structured blocks for mobile display."""
-    if not html_content:
-        return []
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        content_blocks = []
-        all_images = soup.find_all('img')
-        image_positions = {}
-
-        for img in all_images:
-            if img.get('src'):
-                img_id = f"img_{len(image_positions)}"
-                image_positions[img_id] = {
-                    'src': img.get('src'),
-                    'processed': False
-                }
-                marker = soup.new_tag('span')
-                marker['class'] = 'image-marker'
-                marker['data-image-id'] = img_id
-                img.replace_with(marker)
-
-        for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table']):
-            tag_name = element.name
-            if tag_name == 'p':
-                element_text = str(element)
-                markers = element.find_all('span', class_='image-marker')
-                if markers:
-                    text_before = process_text_with_formatting(str(element))
-                    if text_before.strip():
-                        content_blocks.append({
-                            "type": "text",
-                            "content": text_before
-                        })
-                    for marker in markers:
-                        img_id = marker.get('data-image-id')
-                        if img_id and img_id in image_positions and not image_positions[img_id]['processed']:
-                            content_blocks.append({
-                                "type": "image",
-                                "src": image_positions[img_id]['src']
-                            })
-                            image_positions[img_id]['processed'] = True
-                else:
-                    formatted_text = process_text_with_formatting(str(element))
-                    if formatted_text.strip():
-                        content_blocks.append({
-                            "type": "text",
-                            "content": formatted_text
-                        })
-
-            elif tag_name.startswith('h'):
-                level = int(tag_name[1])
-                content_blocks.append({
-                    "type": "header",
-                    "level": level,
-                    "content": process_text_with_formatting(element.get_text())
-                })
-
-            elif tag_name == 'ul' or tag_name == 'ol':
-                list_items = []
-                for li in element.find_all('li', recursive=False):
-                    list_items.append(process_text_with_formatting(li.get_text()))
-
-                content_blocks.append({
-                    "type": "list",
-                    "list_type": "ordered" if tag_name == 'ol' else "unordered",
-                    "items": list_items
-                })
-
-            elif tag_name == 'table':
-                table_images = element.find_all('span', class_='image-marker')
-                for marker in table_images:
-                    img_id = marker.get('data-image-id')
-                    if img_id and img_id in image_positions and not image_positions[img_id]['processed']:
-                        content_blocks.append({
-                            "type": "image",
-                            "src": image_positions[img_id]['src']
-                        })
-                        image_positions[img_id]['processed'] = True
-                table_text = element.get_text().strip()
-                if table_text:
-                    content_blocks.append({
-                        "type": "text",
-                        "content": "Таблица: " + table_text
-                    })
-
-        for img_id, img_info in image_positions.items():
-            if not img_info['processed']:
-                content_blocks.append({
-                    "type": "image",
-                    "src": img_info['src']
-                })
-                img_info['processed'] = True
-
-        merged_blocks = []
-        current_text = ""
-
-        for block in content_blocks:
-            if block["type"] == "text":
-                if current_text:
-                    current_text += "\n\n" + block["content"]
-                else:
-                    current_text = block["content"]
-            else:
-                if current_text:
-                    merged_blocks.append({
-                        "type": "text",
-                        "content": current_text
-                    })
-                    current_text = ""
-                merged_blocks.append(block)
-
-        if current_text:
-            merged_blocks.append({
-                "type": "text",
-                "content": current_text
-            })
-
-        return merged_blocks
-
-    except Exception as e:
-        print(f"Error parsing HTML content: {str(e)}")
-        return [{
-            "type": "text",
-            "content": BeautifulSoup(html_content, 'html.parser').get_text()
-        }]
+def proxy_content_blocks(content_blocks, host_url):
+    """Returns a copy of content blocks with image sources replaced by proxy URLs."""
+    proxied = []
+    for block in content_blocks:
+        if block['type'] == 'image' and block.get('src'):
+            block = {**block, 'src': make_image_proxy_url(block['src'], host_url)}
+        proxied.append(block)
+    return proxied
 
 
 def update_api_response_with_content_blocks(api_response, host_url):
@@ -380,137 +277,226 @@ def update_api_response_with_content_blocks(api_response, host_url):
     if not api_response or not api_response.get('content_html'):
         return api_response
     try:
-        content_blocks = parse_news_detail_for_mobile(api_response['content_html'])
-        for block in content_blocks:
-            if block['type'] == 'image' and block.get('src'):
-                src = block['src']
-                if src.startswith('https'):
-                    original_url = src
-                else:
-                    original_url = f"https://melsu.ru/{src.lstrip('/')}"
-                encoded_url = quote(original_url)
-                proxy_url = f"{host_url}/api/image-proxy?url={encoded_url}"
-                block['src'] = proxy_url
-        api_response['content_blocks'] = content_blocks
+        content_blocks = api_response.get('content_blocks')
+        if content_blocks is None:
+            content_blocks = content_blocks_cache.get(api_response['content_html'])
+        api_response['content_blocks'] = proxy_content_blocks(content_blocks, host_url)
         return api_response
     except Exception as e:
         print(f"Error creating content blocks: {str(e)}")
         return api_response
 
 
+def absolute_melsu_url(src):
+    """Turns an image src found on melsu.ru into an absolute URL."""
+    return src if src.startswith('https') else f"https://melsu.ru/{src.lstrip('/')}"
+
+
+def make_image_proxy_url(src, host_url, width=None, image_format=None):
+    """Builds a URL that serves a melsu.ru image through /api/image-proxy (optionally resized)."""
+    proxy_url = f"{host_url}/api/image-proxy?url={quote(absolute_melsu_url(src))}"
+    if width:
+        proxy_url += f"&w={width}"
+    if image_format:
+        proxy_url += f"&format={image_format}"
+    return proxy_url
+
+
+def json_response_with_etag(payload):
+    """JSON response with a strong ETag of the payload; a matching If-None-Match gets a bodyless 304."""
+    body = app.json.dumps(payload)  # sorted keys, so equal payloads give equal bodies
+    return json_body_response(body, body_etag(body))
+
+
+def json_body_response(body, etag):
+    """Response for an already serialized JSON body and its ETag (see json_response_with_etag)."""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def week_snapshot_response(snapshots):
+    """Serves stored week snapshots; lessons of several teacher names are merged into one list."""
+    if len(snapshots) == 1:
+        return json_body_response(snapshots[0].body, snapshots[0].etag)
+    lessons = [lesson for snapshot in snapshots for lesson in app.json.loads(snapshot.body)]
+    lessons.sort(key=lambda lesson: (lesson['date'], lesson['timeStart'], lesson['id']))
+    return json_response_with_etag(lessons)
+
+
+# Concurrent requests for the same melsu.ru resource share one upstream fetch
+news_flight = SingleFlight(name='news')
+image_flight = SingleFlight(name='images')
+
+news_prefetcher = Prefetcher(
+    name='news-prefetch',
+    workers=app.config['NEWS_PREFETCH_WORKERS'],
+    delay=app.config['NEWS_PREFETCH_DELAY'],
+    max_pending=app.config['NEWS_PREFETCH_MAX_PENDING'],
+)
+
+news_list_cache = StaleWhileRevalidateCache(
+    loader=lambda page: news_flight.do(f"page:{page}", lambda: fetch_news_page(page)),
+    ttl=app.config['NEWS_CACHE_TTL'],
+    stale_ttl=app.config['NEWS_CACHE_STALE_TTL'],
+    max_size=app.config['NEWS_CACHE_MAX_PAGES'],
+    name='news-list'
+)
+
+content_blocks_cache = ContentBlocksCache(
+    parser=parse_news_detail_for_mobile,
+    max_size=app.config['CONTENT_BLOCKS_CACHE_SIZE'],
+    disk_dir=app.config['CONTENT_BLOCKS_CACHE_DIR'],
+    version=CONTENT_BLOCKS_VERSION,
+)
+
+
+def live_news_items(page):
+    """Returns (items, stale) for a page scraped live from melsu.ru (through the page cache).
+
+    If melsu.ru fails (or its circuit is open) the last cached copy is returned with
+    stale=True; items is None when there is none.
+    """
+    try:
+        return news_list_cache.get(page), False
+    except (NewsFetchError, requests.RequestException) as fetch_error:
+        print(f"Error fetching news page {page}: {str(fetch_error)}")
+        return news_list_cache.peek(page), True
+
+
 @app.route('/api/news', methods=['GET'])
 def get_news():
-    """Get news from the university website with image proxy."""
+    """Get news from the local news store (or the university website) with image proxy."""
     try:
         page = request.args.get('page', 1, type=int)
 
         # 1) HTTPS‑хост вместо request.host_url
         host_url = get_host_url()
 
-        url = f"https://melsu.ru/news?page={page}"
-        response = requests.get(url, timeout=15)
+        # Only rows saved from a listing page have description, url and thumbnail;
+        # articles stored by a detail request alone must not replace the live listing
+        pagination = NewsArticle.query \
+            .options(load_only(
+                NewsArticle.id, NewsArticle.title, NewsArticle.category, NewsArticle.date,
+                NewsArticle.description, NewsArticle.url, NewsArticle.image_src
+            )) \
+            .filter(NewsArticle.listing_hash.isnot(None)) \
+            .order_by(NewsArticle.id.desc()) \
+            .paginate(page=page, per_page=app.config['NEWS_PAGE_SIZE'], error_out=False)
+
+        stale = False
+        if pagination.items:
+            items = [article.to_list_dict() for article in pagination.items]
+        else:
+            # Хранилище не заполнено краулером до этой страницы — читаем сайт напрямую
+            items, stale = live_news_items(page)
+            if items is None:
+                return jsonify({"message": "Failed to fetch news", "success": False}), 500
+        # ── пагинация на сайте часто «сломана», а страницы после конца хранилища
+        # берутся с сайта, поэтому просто всегда has_next_page=True
+        has_next_page = True
 
-        if response.status_code != 200:
-            return jsonify({"message": "Failed to fetch news", "success": False}), 500
+        schedule_news_prefetch(items)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
         news_items = []
-        news_boxes = soup.select('.news-box, .first-news-box')
+        for item in items:
+            original_src = item["_debug_original_src"]
+            news_items.append({
+                **item,
+                "image_url": make_image_proxy_url(
+                    original_src, host_url,
+                    width=app.config['NEWS_THUMBNAIL_WIDTH'],
+                    image_format=app.config['NEWS_THUMBNAIL_FORMAT']
+                ) if original_src else None,
+            })
 
-        for news_box in news_boxes:
-            try:
-                link = news_box.select_one('a')
-                if not link:
-                    continue
-                href = link.get('href')
-                if not href:
-                    continue
-
-                match = re.search(r'/news/show/(\d+)', href)
-                if not match:
-                    continue
-                news_id = match.group(1)
-
-                # ── картинка ──────────────────────────────────────────────
-                image_tag = news_box.select_one('img')
-                image_url = None
-                original_src = None
-                if image_tag and image_tag.get('src'):
-                    original_src = image_tag['src']
-                    if original_src.startswith('https'):
-                        original_url = original_src
-                    else:
-                        original_url = f"https://melsu.ru/{original_src.lstrip('/')}"
-                    encoded_url = quote(original_url)
-                    image_url = f"{host_url}/api/image-proxy?url={encoded_url}"
+        payload = {
+            "news": news_items,
+            "page": page,
+            "has_next_page": has_next_page,
+            "success": True,
+        }
+        if stale:
+            # melsu.ru недоступен — отдаём последнюю сохранённую копию
+            payload["stale"] = True
 
-                # ── остальные поля ───────────────────────────────────────
-                category_tag = news_box.select_one('.meta-category')
-                category = clean_text(category_tag.text.strip()) if category_tag else None
+        return json_response_with_etag(payload)
 
-                date_tag = news_box.select_one('.bi-calendar2-week')
-                date = clean_text(date_tag.parent.text.strip()) if date_tag and date_tag.parent else None
+    except Exception as e:
+        print(f"Error getting news: {str(e)}")
+        return jsonify({"message": f"Error: {str(e)}", "success": False}), 500
 
-                title_container = (
-                    news_box.select_one('h2')
-                    or news_box.select_one('h3')
-                    or news_box.select_one('.title')
-                )
-                title = clean_text(title_container.text.strip()) if title_container else None
 
-                description = None
-                description_selectors = (
-                    ['.line-clamp-10 p', '.line-clamp-10', 'p']
-                    if "first-news-box" in news_box.get('class', [])
-                    else ['.description-news p', '.description-news', '.line-clamp-3', 'p']
-                )
-                for selector in description_selectors:
-                    for elem in news_box.select(selector):
-                        text = elem.text.strip()
-                        if text and text != title:
-                            description = clean_text(text)
-                            break
-                    if description:
-                        break
-
-                news_url = href if href.startswith('https') else f"https://melsu.ru/{href.lstrip('/')}"
-
-                news_items.append(
-                    {
-                        "id": news_id,
-                        "title": title,
-                        "category": category,
-                        "date": date,
-                        "description": description,
-                        "image_url": image_url,
-                        "url": news_url,
-                        "_debug_original_src": original_src,
-                    }
-                )
-            except Exception as item_error:
-                print(f"Error processing news item: {str(item_error)}")
-                continue
+@app.route('/api/news/search', methods=['GET'])
+def search_news():
+    """Full-text search over stored news titles and texts, best matches first."""
+    try:
+        query_text = (request.args.get('q') or '').strip()
+        page = max(request.args.get('page', 1, type=int), 1)
+        if len(query_text) < 2:
+            return jsonify({"message": "Query must be at least 2 characters", "success": False}), 400
 
-        # ── пагинация на сайте часто «сломана», поэтому просто всегда has_next_page=True
-        has_next_page = True
+        host_url = get_host_url()
+        per_page = app.config['NEWS_PAGE_SIZE']
 
-        return (
-            jsonify(
-                {
-                    "news": news_items,
-                    "page": page,
-                    "has_next_page": has_next_page,
-                    "success": True,
-                }
-            ),
-            200,
+        ids, total = news_search_index.search(
+            db.session.connection(), query_text, limit=per_page, offset=(page - 1) * per_page
         )
+        articles = NewsArticle.query \
+            .options(load_only(
+                NewsArticle.id, NewsArticle.title, NewsArticle.category, NewsArticle.date,
+                NewsArticle.description, NewsArticle.url, NewsArticle.image_src
+            )) \
+            .filter(NewsArticle.id.in_(ids)) \
+            .all() if ids else []
+        by_id = {article.id: article for article in articles}
+
+        news_items = []
+        for news_id in ids:
+            article = by_id.get(news_id)
+            if article is None:
+                continue
+            item = article.to_list_dict()
+            original_src = item["_debug_original_src"]
+            item["image_url"] = make_image_proxy_url(
+                original_src, host_url,
+                width=app.config['NEWS_THUMBNAIL_WIDTH'],
+                image_format=app.config['NEWS_THUMBNAIL_FORMAT']
+            ) if original_src else None
+            news_items.append(item)
+
+        return json_response_with_etag({
+            "news": news_items,
+            "query": query_text,
+            "page": page,
+            "total": total,
+            "has_next_page": page * per_page < total,
+            "success": True,
+        })
 
     except Exception as e:
-        print(f"Error getting news: {str(e)}")
+        print(f"Error searching news: {str(e)}")
         return jsonify({"message": f"Error: {str(e)}", "success": False}), 500
 
 
+@app.route('/api/news/cache-stats', methods=['GET'])
+@token_required
+def get_news_cache_stats(current_user):
+    """Returns counters of the news, image and upstream caches (admins only)."""
+    if not current_user.is_admin:
+        return jsonify({'message': 'Access denied', 'success': False}), 403
+    return jsonify({
+        'news_list': news_list_cache.stats(),
+        'content_blocks': content_blocks_cache.stats(),
+        'images': image_cache.stats(),
+        'single_flight': [news_flight.stats(), image_flight.stats()],
+        'circuit_breakers': breaker_stats(),
+        'prefetch': news_prefetcher.stats(),
+        'success': True
+    }), 200
+
+
 def get_host_url(force_https: bool = True) -> str:
     """
     Возвращает host‑URL без завершающего «/».
@@ -521,6 +507,19 @@ def get_host_url(force_https: bool = True) -> str:
         host_url = 'https://' + host_url[len('http://'):]
     return host_url
 
+def fetch_and_store_news_detail(news_id, article=None):
+    """Fetches an article from melsu.ru and stores it; returns the detail dict."""
+    detail = fetch_news_detail(news_id)
+    try:
+        stored = store_news_detail(detail, article=article, blocks_parser=content_blocks_cache.get)
+        db.session.commit()
+        detail = stored.to_detail_dict()
+    except Exception as store_error:
+        db.session.rollback()
+        print(f"Error storing news article {news_id}: {str(store_error)}")
+    return detail
+
+
 @app.route('/api/news/<int:news_id>', methods=['GET'])
 def get_news_detail(news_id):
     """Get detailed news article by ID with image proxy and improved content structure."""
@@ -528,75 +527,44 @@ def get_news_detail(news_id):
         # 1) HTTPS‑хост
         host_url = get_host_url()
 
-        url = f"https://melsu.ru/news/show/{news_id}"
-        response = requests.get(url, timeout=15)
-
-        if response.status_code != 200:
-            return jsonify({"message": "News article not found", "success": False}), 404
-
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        title_tag = soup.select_one("h1.text-4xl") or soup.select_one("h1")
-        title = clean_text(title_tag.text.strip()) if title_tag else None
-
-        date_tag = soup.select_one(".bi-calendar2-week")
-        date = clean_text(date_tag.parent.text.strip()) if date_tag and date_tag.parent else None
-
-        content_div = soup.select_one(".content-news")
+        article = db.session.get(NewsArticle, news_id)
+        if article is not None and article.content_hash:
+            detail = article.to_detail_dict()
+        else:
+            # Статьи ещё нет в хранилище — берём с сайта и сохраняем (один запрос на всех)
+            try:
+                detail = news_flight.do(f"detail:{news_id}", lambda: fetch_and_store_news_detail(news_id, article))
+            except NewsFetchError:
+                return jsonify({"message": "News article not found", "success": False}), 404
+            except requests.RequestException as upstream_error:
+                print(f"melsu.ru unavailable for news {news_id}: {str(upstream_error)}")
+                return jsonify({"message": "University website is unavailable", "success": False}), 503
 
         result = {
             "id": str(news_id),
-            "title": title,
-            "date": date,
-            "category": None,
-            "content_html": None,
-            "content_text": None,
+            "title": detail["title"],
+            "date": detail["date"],
+            "category": detail["category"],
+            "content_html": detail["content_html"],
+            "content_text": detail["content_text"],
             "images": [],
             "success": True,
         }
 
-        category_tag = soup.select_one(".meta-category")
-        if category_tag:
-            result["category"] = clean_text(category_tag.text.strip())
-
         # ── контент и заголовочная картинка ────────────────────────────
-        if content_div:
-            result["content_html"] = str(content_div)
-            result["content_text"] = BeautifulSoup(str(content_div), "html.parser").get_text().strip()
-
-            header_img = soup.select_one(".img-news-box img") or soup.select_one(".header-image img")
-            if header_img and header_img.get("src"):
-                src = header_img["src"]
-                original_url = src if src.startswith("https") else f"https://melsu.ru/{src.lstrip('/')}"
-                encoded_url = quote(original_url)
-                proxy_url = f"{host_url}/api/image-proxy?url={encoded_url}"
-                result["images"].append(proxy_url)
-
-            # 2) content_blocks со «заставкой» https‑прокси
+        if detail["content_html"]:
+            if detail.get("header_image_src"):
+                result["images"].append(make_image_proxy_url(detail["header_image_src"], host_url))
+
+            # 2) content_blocks со «заставкой» https‑прокси
+            result["content_blocks"] = detail.get("content_blocks")
             result = update_api_response_with_content_blocks(result, host_url)
 
         # ── навигация «пред./след.» ─────────────────────────────────────
-        prev_article, next_article = None, None
-        navigation_links = soup.select('a[href^="/news/show/"]')
-        for link in navigation_links:
-            link_text = link.text.strip().lower()
-            href = link.get("href", "")
-            match = re.search(r"/news/show/(\d+)", href)
-            if not match:
-                continue
-            link_id = match.group(1)
-
-            if any(x in link_text for x in ("предыдущ", "пред", "←")):
-                title_span = link.select_one("span")
-                prev_article = {"id": link_id, "title": (clean_text(title_span.text) if title_span else "Предыдущая новость")}
-            elif any(x in link_text for x in ("следующ", "след", "→")):
-                title_span = link.select_one("span")
-                next_article = {"id": link_id, "title": (clean_text(title_span.text) if title_span else "Следующая новость")}
+        result["prev_article"] = detail.get("prev_article")
+        result["next_article"] = detail.get("next_article")
 
-        result["prev_article"] = prev_article
-        result["next_article"] = next_article
-
-        return jsonify(result), 200
+        return json_response_with_etag(result)
 
     except Exception as e:
         print(f"Error getting news detail: {str(e)}")
@@ -604,9 +572,186 @@ def get_news_detail(news_id):
 
 
 
+image_cache = ImageDiskCache(
+    cache_dir=app.config['IMAGE_CACHE_DIR'],
+    max_bytes=app.config['IMAGE_CACHE_MAX_BYTES'],
+)
+
+
+def send_cached_image(cached):
+    """Serves an image from the disk cache, answering 304 to matching conditional requests."""
+    response = send_file(
+        cached['path'],
+        mimetype=cached['content_type'],
+        conditional=True,
+        etag=cached['etag'],
+        last_modified=cached['last_modified'],
+        max_age=app.config['IMAGE_CACHE_MAX_AGE'],
+    )
+    response.cache_control.public = True
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def stream_upstream_image(upstream_response, cache_writer, max_bytes, chunk_size):
+    """Passes an upstream image through in chunks, writing it into the disk cache on the way.
+
+    Stops after max_bytes; a truncated or interrupted download is never cached.
+    """
+    received = 0
+    completed = False
+    try:
+        for chunk in upstream_response.iter_content(chunk_size=chunk_size):
+            received += len(chunk)
+            if received > max_bytes:
+                print(f"Image exceeded {max_bytes} bytes, aborting: {upstream_response.url}")
+                break
+            if cache_writer is not None:
+                try:
+                    cache_writer.write(chunk)
+                except OSError as cache_error:
+                    print(f"Error caching image {upstream_response.url}: {str(cache_error)}")
+                    cache_writer.abort()
+                    cache_writer = None
+            yield chunk
+        else:
+            completed = True
+    finally:
+        upstream_response.close()
+        if cache_writer is not None:
+            if completed:
+                try:
+                    cache_writer.commit()
+                except OSError as cache_error:
+                    print(f"Error caching image {upstream_response.url}: {str(cache_error)}")
+                    cache_writer.abort()
+            else:
+                cache_writer.abort()
+
+
+def cache_upstream_image(image_url):
+    """Downloads an image into the disk cache without sending it to a client.
+
+    Returns the cache metadata, or None if the image could not be fetched.
+    """
+    print(f"Fetching image for resizing: {image_url}")
+    upstream_response = upstream_get(
+        image_url,
+        stream=True,
+        headers={'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'},
+        timeout=10
+    )
+    content_type = upstream_response.headers.get('Content-Type', 'image/jpeg')
+    if upstream_response.status_code != 200 or not content_type.startswith('image/'):
+        print(f"Failed to fetch image, status code: {upstream_response.status_code}")
+        upstream_response.close()
+        return None
+
+    cache_writer = image_cache.open_writer(
+        image_url, content_type,
+        last_modified=upstream_response.headers.get('Last-Modified')
+    )
+    chunks = stream_upstream_image(
+        upstream_response, cache_writer,
+        app.config['IMAGE_PROXY_MAX_BYTES'], app.config['IMAGE_PROXY_CHUNK_SIZE']
+    )
+    for _chunk in chunks:
+        pass
+    return image_cache.get(image_url)
+
+
+def render_and_cache_variant(image_url, variant, width, height, output_format):
+    """Renders a variant into the disk cache and returns its cache metadata.
+
+    Returns the original's metadata if Pillow cannot read the image, and None if the
+    image could not be fetched.
+    """
+    original = image_cache.get(image_url) or image_flight.do(image_url, lambda: cache_upstream_image(image_url))
+    if original is None:
+        return None
+
+    try:
+        content, content_type = resize_pool.submit(
+            render_image_variant, original['path'], width, height, output_format
+        ).result(timeout=30)
+    except UNREADABLE_IMAGE_ERRORS as e:
+        # Not an image Pillow can read (or a decompression bomb): serve the original instead
+        print(f"Error resizing image {image_url}: {str(e)}")
+        return original
+
+    return image_cache.put(
+        image_url, content, content_type,
+        last_modified=original['last_modified'], variant=variant
+    )
+
+
+def serve_image_variant(image_url, width, height, output_format):
+    """Serves a resized/re-encoded copy of an image, rendering it once and caching it on disk."""
+    variant = variant_name(width, height, output_format)
+    cached = image_cache.get(image_url, variant)
+    if cached is None:
+        cached = image_flight.do(
+            f"{image_url}\x1f{variant}",
+            lambda: render_and_cache_variant(image_url, variant, width, height, output_format)
+        )
+    if cached is None:
+        return jsonify({"message": "Failed to fetch image"}), 502
+    return send_cached_image(cached)
+
+
+def proxy_upstream_image(image_url):
+    """Streams an image from melsu.ru to the client, storing it in the disk cache on the way."""
+    print(f"Proxying image from: {image_url}")
+
+    upstream_response = upstream_get(
+        image_url,
+        stream=True,
+        headers={'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'},
+        timeout=10
+    )
+
+    if upstream_response.status_code != 200:
+        print(f"Failed to fetch image, status code: {upstream_response.status_code}")
+        upstream_response.close()
+        return jsonify({"message": "Failed to fetch image"}), upstream_response.status_code
+
+    content_type = upstream_response.headers.get('Content-Type', 'image/jpeg')
+    content_length = upstream_response.headers.get('Content-Length')
+    max_bytes = app.config['IMAGE_PROXY_MAX_BYTES']
+
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        print(f"Image is too large ({content_length} bytes): {image_url}")
+        upstream_response.close()
+        return jsonify({"message": "Image is too large"}), 502
+
+    cache_writer = None
+    if content_type.startswith('image/'):
+        try:
+            cache_writer = image_cache.open_writer(
+                image_url, content_type,
+                last_modified=upstream_response.headers.get('Last-Modified')
+            )
+        except OSError as cache_error:
+            print(f"Error caching image {image_url}: {str(cache_error)}")
+
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Cache-Control': 'public, max-age=86400'
+    }
+    # iter_content() decodes Content-Encoding, so the upstream length is only valid without it
+    if content_length and not upstream_response.headers.get('Content-Encoding'):
+        headers['Content-Length'] = content_length
+
+    return Response(
+        stream_upstream_image(upstream_response, cache_writer, max_bytes, app.config['IMAGE_PROXY_CHUNK_SIZE']),
+        content_type=content_type,
+        headers=headers
+    )
+
+
 @app.route('/api/image-proxy', methods=['GET'])
 def image_proxy():
-    """Proxy for images from the university website."""
+    """Proxy for images from the university website (cached on disk)."""
     try:
         image_url = request.args.get('url')
         if not image_url:
@@ -622,35 +767,110 @@ def image_proxy():
                 image_url = f"/{image_url}"
             image_url = f"https://melsu.ru{image_url}"
 
-        print(f"Proxying image from: {image_url}")
+        # Only melsu.ru images: every other host would get its own circuit breaker and cache entries
+        if not is_allowed_url(image_url):
+            return jsonify({"message": "Only images from the university website can be proxied"}), 400
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://melsu.ru/',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-        }
+        try:
+            variant_args = parse_variant_args(request.args)
+        except ImageVariantError as e:
+            return jsonify({"message": str(e)}), 400
+        if variant_args is not None:
+            return serve_image_variant(image_url, *variant_args)
+
+        cached = image_cache.get(image_url)
+        if cached is not None:
+            return send_cached_image(cached)
+
+        is_leader, flight = image_flight.begin(image_url)
+        if not is_leader:
+            # Another request is already downloading this image into the cache
+            try:
+                cached = flight.wait(image_flight.timeout)
+            except Exception as wait_error:
+                print(f"Error waiting for image {image_url}: {str(wait_error)}")
+                cached = None
+            if cached is not None:
+                return send_cached_image(cached)
+            return proxy_upstream_image(image_url)
 
-        response = requests.get(image_url, stream=True, headers=headers, timeout=10)
+        try:
+            response = make_response(proxy_upstream_image(image_url))
+        except BaseException as e:
+            image_flight.finish(image_url, error=e)
+            raise
+        # The body is still being streamed; followers are released once it is in the cache
+        response.call_on_close(lambda: image_flight.finish(image_url, result=image_cache.get(image_url)))
+        return response
+
+    except requests.RequestException as e:
+        print(f"melsu.ru unavailable for image: {str(e)}")
+        return jsonify({"message": "University website is unavailable"}), 503
+    except Exception as e:
+        print(f"Error in image proxy: {str(e)}")
+        return jsonify({"message": f"Error: {str(e)}"}), 500
 
-        if response.status_code != 200:
-            print(f"Failed to fetch image, status code: {response.status_code}")
-            return jsonify({"message": "Failed to fetch image"}), response.status_code
 
-        content_type = response.headers.get('Content-Type', 'image/jpeg')
+# === News Prefetch === #
 
-        return Response(
-            response.content,
-            content_type=content_type,
-            headers={
-                'Access-Control-Allow-Origin': '*',
-                'Cache-Control': 'public, max-age=86400',
-                'Content-Length': str(len(response.content))
-            }
-        )
+def melsu_is_healthy():
+    """False while the circuit breaker for melsu.ru is open or probing; prefetch backs off then."""
+    return breaker_for('https://melsu.ru/').state == CircuitBreaker.CLOSED
 
-    except Exception as e:
-        print(f"Error in image proxy: {str(e)}")
-        return jsonify({"message": f"Error: {str(e)}"}), 500
+
+def prefetch_header_image(image_url):
+    """Downloads an article header image into the image cache."""
+    if not is_allowed_url(image_url) or image_cache.contains(image_url) or not melsu_is_healthy():
+        return
+    news_prefetcher.pace()
+    image_flight.do(image_url, lambda: cache_upstream_image(image_url))
+
+
+def prefetch_news_detail(news_id):
+    """Fetches and stores an article that is not in the local store yet, then its header image.
+
+    Only the detail is stored: listing rows are written by news_crawler.py, so a
+    prefetched article never changes which source /api/news reads the listing from.
+    """
+    if not melsu_is_healthy():
+        return
+    with app.app_context():
+        article = db.session.get(NewsArticle, news_id)
+        if article is not None and article.content_hash:
+            header_image_src = article.header_image_src
+        else:
+            news_prefetcher.pace()
+            detail = news_flight.do(f"detail:{news_id}", lambda: fetch_and_store_news_detail(news_id, article))
+            header_image_src = detail.get("header_image_src")
+    if header_image_src:
+        image_url = absolute_melsu_url(header_image_src)
+        news_prefetcher.submit(f"image:{image_url}", lambda: prefetch_header_image(image_url))
+
+
+def warm_news_items(news_ids):
+    """Schedules prefetch of every article (and header image) of a listing page."""
+    with app.app_context():
+        stored = {
+            article.id: article.header_image_src
+            for article in NewsArticle.query
+            .options(load_only(NewsArticle.id, NewsArticle.header_image_src))
+            .filter(NewsArticle.id.in_(news_ids), NewsArticle.content_hash.isnot(None))
+            .all()
+        }
+    for news_id in news_ids:
+        if news_id not in stored:
+            news_prefetcher.submit(f"detail:{news_id}", lambda news_id=news_id: prefetch_news_detail(news_id))
+        elif stored[news_id]:
+            image_url = absolute_melsu_url(stored[news_id])
+            news_prefetcher.submit(f"image:{image_url}", lambda image_url=image_url: prefetch_header_image(image_url))
+
+
+def schedule_news_prefetch(items):
+    """Warms the detail and image caches for a listing page in the background (get_news does not wait)."""
+    if not app.config['NEWS_PREFETCH_ENABLED'] or not items:
+        return
+    news_ids = [int(item["id"]) for item in items]
+    news_prefetcher.submit(f"page:{','.join(map(str, news_ids))}", lambda: warm_news_items(news_ids))
 
 
 # === Authentication Endpoints === #
@@ -703,18 +923,14 @@ def register():
     if email and '@' not in email:
         return jsonify({'message': 'Некорректный формат email'}), 400
 
+    base_username = None
     if 'username' not in data or not data['username']:
-        username = generate_username(data['fullName'], data.get('group'), data.get('role'))
-        attempt = 0
-        base_username = username
-        while username_exists(username):
-            attempt += 1
-            username = f"{base_username}{attempt}"
+        base_username = generate_username(data['fullName'], data.get('group'), data.get('role'))
+        username = base_username
     else:
         username = data['username']
-
-    if username_exists(username):
-        return jsonify({'message': 'Пользователь с таким логином уже существует'}), 400
+        if username_exists(username):
+            return jsonify({'message': 'Пользователь с таким логином уже существует'}), 400
 
     try:
         new_user = User(
@@ -743,8 +959,15 @@ def register():
         elif data.get('role') == 'teacher':
             new_user.verification_status = 'verified'
 
-        db.session.add(new_user)
-        db.session.commit()
+        if base_username:
+            def stage_new_user(allocated_username):
+                new_user.username = allocated_username
+                db.session.add(new_user)
+
+            save_with_unique_username([base_username], stage_new_user)
+        else:
+            db.session.add(new_user)
+            db.session.commit()
         token = create_token(new_user.id)
 
         return jsonify({
@@ -832,7 +1055,11 @@ def login():
 @app.route('/api/users', methods=['GET'])
 @token_required
 def get_users(current_user):
-    """Gets users filtered by role and optionally by group and verification status."""
+    """Gets users filtered by role and optionally by group and verification status.
+
+    Optional: q= (name or login prefix), fields= (comma-separated keys), limit=/cursor=
+    (pages ordered by id; the next page's cursor is returned in the X-Next-Cursor header).
+    """
     role = request.args.get('role')
     group = request.args.get('group')
     verification_status = request.args.get('verification_status')
@@ -850,40 +1077,35 @@ def get_users(current_user):
         elif verification_status == 'unverified_only':
             query = query.filter(User.verification_status.in_(['unverified', 'pending', 'rejected']))
 
-    users = query.all()
-    result = []
-    for user in users:
-        if user.id != current_user.id:
-            user_data = {
-                'id': user.id,
-                'username': user.username,
-                'fullName': user.full_name,
-                'role': user.role,
-                'verificationStatus': user.verification_status or 'verified'
-            }
-            if user.role == 'student':
-                user_data['group'] = user.group
-                user_data['faculty'] = user.faculty
-                user_data['speciality'] = {
-                    'id': user.speciality_id,
-                    'code': user.speciality_code,
-                    'name': user.speciality_name,
-                    'form': user.study_form,
-                    'formName': user.study_form_name
-                } if user.speciality_id else None
-                try:
-                    schedule_item = Schedule.query.filter_by(group_name=user.group).first()
-                    if schedule_item:
-                        user_data['course'] = schedule_item.course
-                except Exception as e:
-                    print(f"Error getting course from schedule: {str(e)}")
-            elif user.role == 'teacher':
-                teacher = Teacher.query.filter_by(user_id=user.id).first()
-                if teacher:
-                    user_data['department'] = teacher.department
-                    user_data['position'] = teacher.position
-            result.append(user_data)
-    return jsonify(result)
+    search = (request.args.get('q') or '').strip()
+    if search:
+        pattern = like_prefix(search)
+        query = query.filter(db.or_(User.full_name.like(pattern, escape='\\'), User.username.like(pattern, escape='\\')))
+
+    query = query.filter(User.id != current_user.id)
+    fields = parse_fields(request.args.get('fields'))
+
+    # Keyset pagination is opt-in so that clients without limit/cursor still get the full list
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    next_cursor = None
+    if cursor is not None or limit is not None:
+        limit = min(max(limit or app.config['USERS_PAGE_SIZE'], 1), app.config['USERS_PAGE_MAX_SIZE'])
+        if cursor:
+            if not cursor.isdigit():
+                return jsonify({'message': 'Некорректный курсор'}), 400
+            query = query.filter(User.id > int(cursor))
+        users = query.order_by(User.id).limit(limit + 1).all()
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = str(users[-1].id)
+    else:
+        users = query.all()
+
+    response = jsonify(serialize_directory(users, fields))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
@@ -928,12 +1150,9 @@ def get_user(current_user, user_id):
                         db.session.rollback()
 
     if user.role == 'student' and user.group:
-        try:
-            schedule_item = Schedule.query.filter_by(group_name=user.group).first()
-            if schedule_item:
-                user_data['course'] = schedule_item.course
-        except Exception as e:
-            print(f"Error getting course from schedule: {str(e)}")
+        course = group_catalog.course_of(user.group)
+        if course is not None:
+            user_data['course'] = course
 
     return jsonify(user_data)
 
@@ -971,23 +1190,18 @@ def get_teacher_info(current_user, user_id):
 @app.route('/api/teachers/search', methods=['GET'])
 @token_required
 def search_teachers(current_user):
-    """Searches for teachers by name."""
+    """Searches for teachers by name, best matches first.
+
+    Optional: limit= (at most that many results; all matches are returned without it).
+    """
     try:
         name = request.args.get('name', '')
         if not name or len(name) < 3:
             return jsonify({'message': 'Для поиска требуется не менее 3 символов'}), 400
-        teachers = Teacher.query.filter(Teacher.name.ilike(f'%{name}%')).all()
-        results = []
-        for teacher in teachers:
-            user = User.query.get(teacher.user_id) if teacher.user_id else None
-            results.append({
-                'id': teacher.id,
-                'name': teacher.name,
-                'department': teacher.department,
-                'position': teacher.position,
-                'user_id': teacher.user_id,
-                'has_account': teacher.has_account and user is not None
-            })
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(limit, 1)
+        results = teacher_index.search(name, limit=limit)
         return jsonify(results), 200
     except Exception as e:
         print(f"Error searching teachers: {str(e)}")
@@ -999,6 +1213,9 @@ def search_teachers(current_user):
 def change_password_api(current_user):
     """Changes the current user's password."""
     try:
+        current_user = load_current_user(current_user)
+        if not current_user:
+            return jsonify({'message': 'User not found'}), 401
         data = request.json
         if not data or not data.get('currentPassword') or not data.get('newPassword'):
             return jsonify({'message': 'Необходимо указать текущий и новый пароль', 'success': False}), 400
@@ -1032,94 +1249,17 @@ def change_password_api(current_user):
 @token_required
 def get_profile(current_user):
     """Gets the profile information for the current authenticated user."""
-    role = current_user.role or ('admin' if current_user.is_admin else 'unknown')
     try:
-        query = """
-        SELECT
-            id,
-            username,
-            full_name,
-            email, role,
-            `group`,
-            faculty,
-            verification_status,
-            student_card_image,
-            speciality_id,
-            speciality_code,
-            speciality_name,
-            study_form,
-            study_form_name
-        FROM user
-        WHERE id = :user_id
-        """
-        with db.engine.connect() as connection:
-            result = connection.execute(db.text(query), {"user_id": current_user.id})
-            user_data = result.fetchone()
-            if not user_data:
-                return jsonify({'message': 'Пользователь не найден'}), 404
-            user_dict = dict(zip(result.keys(), user_data))
+        profile_data = profile_cache.get_profile(current_user.id)
+        if profile_data is None:
+            return jsonify({'message': 'Пользователь не найден'}), 404
     except Exception as e:
-        print(f"ERROR: Direct DB query failed: {str(e)}")
-        user_dict = {
-            'id': current_user.id,
-            'username': current_user.username,
-            'email': getattr(current_user, 'email', None),
-            'full_name': current_user.full_name,
-            'role': current_user.role,
-            'group': current_user.group,
-            'faculty': current_user.faculty,
-            'verification_status': current_user.verification_status,
-            'student_card_image': current_user.student_card_image,
-            'speciality_id': current_user.speciality_id,
-            'speciality_code': current_user.speciality_code,
-            'speciality_name': current_user.speciality_name,
-            'study_form': current_user.study_form,
-            'study_form_name': current_user.study_form_name,
-        }
-
-    teacher_info = None
-    if role == 'teacher':
-        teacher = Teacher.query.filter_by(user_id=current_user.id).first()
-        if teacher:
-            teacher_info = {
-                'position': teacher.position,
-                'department': teacher.department,
-                'name': teacher.name
-            }
-
-    profile_data = {
-        'id': user_dict['id'],
-        'username': user_dict['username'],
-        'email': user_dict.get('email'),
-        'fullName': user_dict['full_name'] or (teacher_info['name'] if teacher_info else ''),
-        'role': user_dict['role'],
-        'group': user_dict['group'],
-        'faculty': user_dict['faculty'],
-        'department': teacher_info['department'] if teacher_info else None,
-        'position': teacher_info['position'] if teacher_info else None,
-        'verificationStatus': user_dict['verification_status'] or 'verified',
-        'studentCardImage': user_dict['student_card_image'],
-        'speciality': {
-            'id': user_dict['speciality_id'],
-            'code': user_dict['speciality_code'],
-            'name': user_dict['speciality_name'],
-            'form': user_dict['study_form'],
-            'formName': user_dict['study_form_name']
-        }
-    }
-
-    if role == 'student' and user_dict['group']:
-        try:
-            schedule_query = "SELECT course FROM schedule WHERE group_name = :group_name LIMIT 1"
-            with db.engine.connect() as connection:
-                schedule_result = connection.execute(db.text(schedule_query), {"group_name": user_dict['group']})
-                schedule_data = schedule_result.fetchone()
-                if schedule_data:
-                    profile_data['course'] = schedule_data[0]
-        except Exception as e:
-            print(f"DEBUG: Error fetching course from schedule: {str(e)}")
+        db.session.rollback()
+        print(f"ERROR: Profile query failed: {str(e)}")
+        role = current_user.role or ('admin' if current_user.is_admin else 'unknown')
+        profile_data = build_profile(current_user, role)
 
-    return jsonify(profile_data), 200
+    return json_response_with_etag(profile_data)
 
 
 # === Schedule Endpoints === #
@@ -1142,17 +1282,23 @@ def get_schedule_groups(current_user):
 @app.route('/api/schedule', methods=['GET'])
 @token_required
 def get_schedule(current_user):
-    """Gets the schedule for a group or teacher."""
+    """Gets the schedule for a group or teacher.
+
+    Optional: date= (one day), from=/to= (inclusive range), week= (a day in the week or
+    2025-W36), limit=/cursor= (the next page's cursor is returned in the X-Next-Cursor header).
+    A week= request without limit/cursor is answered from the week snapshots, with an ETag.
+    """
     group = request.args.get('group')
-    date = request.args.get('date')
     teacher_id = request.args.get('teacher_id')
     query = Schedule.query
+    snapshot_owners = None  # (kind, names) of the precomputed weeks matching this query
 
     if current_user.role == 'student':
         if not group and current_user.group:
             group = current_user.group
         if group:
             query = query.filter_by(group_name=group)
+            snapshot_owners = ('group', [group])
     elif current_user.role == 'teacher':
         teacher = Teacher.query.filter_by(user_id=current_user.id).first()
         if teacher:
@@ -1166,37 +1312,42 @@ def get_schedule(current_user):
                     teacher_names.append(schedule_teacher.name)
             if teacher_names:
                 query = query.filter(Schedule.teacher_name.in_(teacher_names))
+                snapshot_owners = ('teacher', teacher_names)
                 print(f"Filtering schedule for teacher by names: {teacher_names}")
             else:
                 print(f"No teacher names found for user_id={current_user.id}, teacher_id={teacher.id}")
 
-    if date:
+    try:
+        start, end = parse_schedule_range(request.args)
+    except ValueError:
+        return jsonify({'message': 'Некорректный диапазон дат'}), 400
+
+    # A whole week is served from the snapshots written by sync_schedule
+    week_request = request.args.get('week') and 'limit' not in request.args and 'cursor' not in request.args
+    if week_request and snapshot_owners:
         try:
-            query_date = datetime.datetime.strptime(date, '%Y-%m-%d').date()
-            query = query.filter_by(date=query_date)
-        except ValueError:
-            pass
+            snapshots = get_week_snapshots(snapshot_owners[0], snapshot_owners[1], start)
+            if snapshots:
+                return week_snapshot_response(snapshots)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error reading schedule snapshots: {str(e)}")
 
-    query = query.order_by(Schedule.date, Schedule.time_start)
-    query = query.limit(100)
-    schedules = query.all()
-
-    result = []
-    for schedule in schedules:
-        result.append({
-            'id': schedule.id,
-            'date': schedule.date.strftime('%Y-%m-%d'),
-            'timeStart': schedule.time_start,
-            'timeEnd': schedule.time_end,
-            'weekday': schedule.weekday,
-            'subject': schedule.subject,
-            'lessonType': schedule.lesson_type,
-            'group': schedule.group_name,
-            'teacher': schedule.teacher_name,
-            'auditory': schedule.auditory,
-            'subgroup': schedule.subgroup
-        })
-    return jsonify(result), 200
+    # A week is returned in one call; other requests are paged (the old fixed limit of 100)
+    default_limit = app.config['SCHEDULE_PAGE_MAX_SIZE'] if request.args.get('week') else app.config['SCHEDULE_PAGE_SIZE']
+    limit = min(max(request.args.get('limit', type=int) or default_limit, 1), app.config['SCHEDULE_PAGE_MAX_SIZE'])
+    try:
+        schedules, next_cursor = fetch_schedule_page(query, start, end, request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'message': 'Некорректный курсор'}), 400
+
+    if week_request and not next_cursor:
+        # Weeks without a snapshot (no lessons, or not synced since snapshots were added)
+        return json_response_with_etag([serialize_lesson(schedule) for schedule in schedules])
+    response = jsonify([serialize_lesson(schedule) for schedule in schedules])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @app.route('/api/schedule/course', methods=['GET'])
@@ -1209,12 +1360,12 @@ def get_course_from_schedule(current_user):
         return jsonify({'message': 'Не указана группа', 'success': False}), 400
 
     try:
-        schedule_item = Schedule.query.filter_by(group_name=group).first()
-        if not schedule_item:
+        group_info = group_catalog.get(group)
+        if not group_info:
             return jsonify({'message': 'Расписание для группы не найдено', 'success': False}), 404
 
         return jsonify({
-            'course': schedule_item.course,
+            'course': group_info['course'],
             'group': group,
             'success': True
         }), 200
@@ -2005,6 +2156,9 @@ def test_notification(current_user):
 @token_required
 def upload_student_card(current_user):
     """Uploads a student card image for verification."""
+    current_user = load_current_user(current_user)
+    if not current_user:
+        return jsonify({'message': 'User not found'}), 401
     if current_user.role != 'student':
         return jsonify({'message': 'Только студенты могут загружать студенческий билет'}), 403
     if 'studentCard' not in request.files:
@@ -2058,6 +2212,9 @@ def get_verification_status(current_user):
 @token_required
 def cancel_verification(current_user):
     """Cancels a pending or rejected verification."""
+    current_user = load_current_user(current_user)
+    if not current_user:
+        return jsonify({'message': 'User not found'}), 401
     if current_user.role != 'student':
         return jsonify({'message': 'Только студенты могут отменить верификацию'}), 403
     if current_user.verification_status not in ['pending', 'rejected']:
@@ -2091,6 +2248,9 @@ def cancel_verification(current_user):
 @token_required
 def reupload_student_card(current_user):
     """Reuploads a student card after rejection or unverified status."""
+    current_user = load_current_user(current_user)
+    if not current_user:
+        return jsonify({'message': 'User not found'}), 401
     if current_user.role != 'student':
         return jsonify({'message': 'Только студенты могут загружать студенческий билет'}), 403
     if current_user.verification_status not in ['rejected', 'unverified']:
@@ -2462,6 +2622,22 @@ def get_unread_tickets_count(current_user):
         return jsonify({"message": f"Error: {str(e)}"}), 500
 
 
+# === Cache Statistics === #
+
+@app.route('/api/cache-stats', methods=['GET'])
+@token_required
+def get_cache_stats(current_user):
+    """Returns counters of the user and teacher caches (admins only); news caches are in /api/news/cache-stats."""
+    if not current_user.is_admin:
+        return jsonify({'message': 'Access denied', 'success': False}), 403
+    return jsonify({
+        'auth': auth_cache.stats(),
+        'profiles': profile_cache.stats(),
+        'teacher_index': teacher_index.stats(),
+        'success': True
+    }), 200
+
+
 # === Error Handlers === #
 
 @app.errorhandler(404)
@@ -2517,4 +2693,9 @@ if __name__ == '__main__':
         except Exception as e:
              print(f"Error checking/adding password_plain column: {str(e)}")
 
+        try:
+            teacher_index.load()
+        except Exception as e:
+            print(f"Error loading teacher search index: {str(e)}")
+
     app.run(debug=True, host='0.0.0.0', port=5001)
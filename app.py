@@ -25,7 +25,16 @@ from sqlalchemy import or_
 from werkzeug.security import generate_password_hash, check_password_hash # Ensure check_password_hash is imported
 from werkzeug.utils import secure_filename
 
+from cache_invalidation import invalidation_bus
 from db import db
+from group_catalog import group_catalog, rebuild_group_catalog
+from schedule_snapshots import rebuild_schedule_snapshots
+from schedule_sync import (
+    SOURCE_ORDER_BY, sync_schedule_diff, iter_source_records, insert_schedule_records
+)
+from teacher_provisioning import provision_teacher_accounts
+from user_directory import apply_user_search
+from username_allocator import save_with_unique_username
 
 # Import models after db initialization
 from models import (
@@ -42,6 +51,8 @@ app.config.from_object('config')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
 db.init_app(app)
+invalidation_bus.init_app(app)
+group_catalog.init_app(app)
 
 UPLOAD_FOLDER = 'uploads'
 STUDENT_CARDS_FOLDER = os.path.join(UPLOAD_FOLDER, 'student_cards')
@@ -153,14 +164,7 @@ def students_list():
         query = query.filter_by(verification_status=status)
 
     if search_query:
-        query = query.filter(
-            db.or_(
-                User.username.ilike(f'%{search_query}%'),
-                User.full_name.ilike(f'%{search_query}%'),
-                User.group.ilike(f'%{search_query}%'),
-                User.email.ilike(f'%{search_query}%')
-            )
-        )
+        query = apply_user_search(query, search_query)
 
     verified_count = User.query.filter_by(role='student', verification_status='verified').count()
     pending_count = User.query.filter_by(role='student', verification_status='pending').count()
@@ -347,12 +351,17 @@ def regenerate_teacher_credentials(teacher_id):
             flash('User account not found', 'error')
             return redirect(url_for('teachers_list'))
 
-        # Assume Teacher model has generate_credentials method
-        username, password = Teacher.generate_credentials(name=teacher.name)
-        user.username = username
-        user.password_plain = password
-        user.password = generate_password_hash(password)
-        db.session.commit()
+        password = Teacher.generate_password()
+        password_hash = generate_password_hash(password)
+
+        def stage_credentials(allocated_username):
+            user.username = allocated_username
+            user.password_plain = password
+            user.password = password_hash
+
+        username = save_with_unique_username(
+            Teacher.username_candidates(teacher.name), stage_credentials, max_suffix=100, fallback=Teacher.random_login
+        )
 
         # Send notification about changed credentials
         admin_id = session.get('user_id')
@@ -395,6 +404,7 @@ def sync_teachers():
                         new_teacher = Teacher(name=name,position=position,department=department)
                         db.session.add(new_teacher)
                         added_count += 1
+            invalidation_bus.publish('teachers')  # the bulk delete above bypasses ORM tracking
             db.session.commit()
             flash(f'Teacher data successfully synced. Added {added_count} new teachers.', 'success')
         except requests.exceptions.RequestException as e:
@@ -486,19 +496,24 @@ def create_teacher_account(teacher_id):
         if teacher.has_account:
             flash('This teacher already has an account', 'warning')
             return redirect(url_for('teachers_list'))
-        username, password = Teacher.generate_credentials(name=teacher.name) # Assumes generate_credentials is a static/class method in Teacher model
-        new_user = User(username=username,password=password,is_admin=False) # Assumes User model handles password hashing
+        password = Teacher.generate_password()
+        new_user = User(username='', password=password, is_admin=False) # Login is allocated below
         new_user.role = 'teacher'
         new_user.full_name = teacher.name
         new_user.verification_status = 'verified'
         if teacher.department:
             new_user.faculty = teacher.department # Using 'faculty' for teacher department for consistency? Revisit model if needed.
 
-        db.session.add(new_user)
-        db.session.flush()
-        teacher.has_account = True
-        teacher.user_id = new_user.id
-        db.session.commit()
+        def stage_account(allocated_username):
+            new_user.username = allocated_username
+            db.session.add(new_user)
+            db.session.flush()
+            teacher.has_account = True
+            teacher.user_id = new_user.id
+
+        username = save_with_unique_username(
+            Teacher.username_candidates(teacher.name), stage_account, max_suffix=100, fallback=Teacher.random_login
+        )
 
         admin_id = session.get('user_id')
         create_and_send_notification(
@@ -517,6 +532,28 @@ def create_teacher_account(teacher_id):
         print(f"Error creating account: {e}")
     return redirect(url_for('teachers_list'))
 
+@app.route('/teachers/create_accounts', methods=['POST'])
+@login_required
+def create_all_teacher_accounts():
+    """Creates accounts for all teachers that do not have one yet."""
+    try:
+        result = provision_teacher_accounts(
+            sender_id=session.get('user_id'),
+            batch_size=app.config['TEACHER_PROVISION_BATCH_SIZE'],
+            workers=app.config['TEACHER_PROVISION_WORKERS']
+        )
+        if not result['teachers']:
+            flash('All teachers already have accounts', 'warning')
+        elif result['failed']:
+            flash(f"Created {result['created']} accounts, {result['failed']} failed (see server log)", 'error')
+        else:
+            flash(f"Created {result['created']} teacher accounts", 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error creating accounts: {e}', 'error')
+        print(f"Error creating accounts: {e}")
+    return redirect(url_for('teachers_list'))
+
 # === Schedule Management === #
 
 @app.route('/schedule')
@@ -585,6 +622,7 @@ def sync_schedule():
     sync_success = False
     changes_detected = False
     changes_by_group = {}
+    sync_stats = None
 
     # Helper functions (local to sync_schedule or defined globally)
     def get_semesters_from_db():
@@ -599,9 +637,11 @@ def sync_schedule():
         try:
             semester = request.form.get('semester', '')
             group = request.form.get('group', '')
+            # 'diff' writes only the changes in one transaction; 'replace' deletes and reloads the scope
+            mode = request.form.get('mode', 'diff')
 
             current_schedules = {}
-            if group:
+            if group and mode == 'replace':
                 existing_schedules = Schedule.query.filter_by(group_name=group).all()
                 for sch in existing_schedules:
                     key = f"{sch.date}_{sch.time_start}_{sch.subject}_{sch.group_name}"
@@ -618,12 +658,14 @@ def sync_schedule():
                 database='timetable',
                 port=3306,
                 charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor,
+                # Unbuffered: rows are streamed by fetchmany instead of being read into memory by execute
+                cursorclass=pymysql.cursors.SSDictCursor,
                 connect_timeout=30
             )
             # --- End Sensitive Data ---
 
-            with connection.cursor() as cursor:
+            # The connection is closed when the block exits, errors included
+            with connection, connection.cursor() as cursor:
                 query = """
                     SELECT
                         semester, week_number, group_name, course, faculty,
@@ -640,77 +682,91 @@ def sync_schedule():
                 if group:
                     query += " AND group_name = %s"
                     params.append(group)
+                if mode == 'diff':
+                    query += SOURCE_ORDER_BY
 
                 cursor.execute(query, params)
-                batch_size = 1000
+                batch_size = app.config['SCHEDULE_SYNC_BATCH_SIZE']
                 total_records = 0
 
-                if semester or group:
-                    filters = {}
-                    if semester: filters['semester'] = int(semester)
-                    if group: filters['group_name'] = group
-                    Schedule.query.filter_by(**filters).delete()
+                filters = {}
+                if semester: filters['semester'] = int(semester)
+                if group: filters['group_name'] = group
+
+                if mode == 'diff':
+                    summary = sync_schedule_diff(iter_source_records(cursor, batch_size), filters, batch_size)
+                    sync_stats = summary.stats()
+                    total_records = sync_stats['inserted'] + sync_stats['updated'] + sync_stats['unchanged']
+                    snapshot_groups, snapshot_teachers = summary.groups, summary.teachers
+                    if group:
+                        changes_by_group = dict(summary.changes_by_group)
+                        changes_detected = bool(changes_by_group)
                 else:
-                    db.session.execute(db.text("TRUNCATE TABLE schedule"))
-
-                db.session.commit()
-
-                while True:
-                    records = cursor.fetchmany(batch_size)
-                    if not records: break
-                    for record in records:
-                        new_schedule = Schedule(
-                            semester=record['semester'],
-                            week_number=record['week_number'],
-                            group_name=record['group_name'],
-                            course=record['course'],
-                            faculty=record['faculty'],
-                            subject=record['subject'],
-                            lesson_type=record['lesson_type'],
-                            subgroup=record['subgroup'],
-                            date=record['date'],
-                            time_start=record['time_start'],
-                            time_end=record['time_end'],
-                            weekday=record['weekday'],
-                            teacher_name=record['teacher_name'],
-                            auditory=record['auditory']
-                        )
-                        db.session.add(new_schedule)
-
-                        # Check for changes only if syncing a specific group
-                        if group:
-                            key = f"{record['date']}_{record['time_start']}_{record['subject']}_{record['group_name']}"
-                            old_schedule = current_schedules.get(key)
-                            if old_schedule:
-                                changed = False
-                                changes = {}
-                                if old_schedule.teacher_name != record['teacher_name']:
-                                    changed = True
-                                    changes['teacher'] = {'old': old_schedule.teacher_name,'new': record['teacher_name']}
-                                if old_schedule.auditory != record['auditory']:
-                                    changed = True
-                                    changes['auditory'] = {'old': old_schedule.auditory,'new': record['auditory']}
-                                if old_schedule.time_start != record['time_start'] or old_schedule.time_end != record['time_end']:
-                                    changed = True
-                                    changes['time'] = {'old': f"{old_schedule.time_start}-{old_schedule.time_end}",'new': f"{record['time_start']}-{record['time_end']}"}
-
-                                if changed:
-                                    changes_detected = True
-                                    group_name = record['group_name']
-                                    if group_name not in changes_by_group:
-                                        changes_by_group[group_name] = []
-                                    changes_by_group[group_name].append({
-                                        'date': record['date'].strftime('%d.%m.%Y') if hasattr(record['date'],'strftime') else str(record['date']),
-                                        'subject': record['subject'],
-                                        'changes': changes,
-                                        'schedule_id': old_schedule.id
-                                    })
+                    # Week snapshots of every group and teacher whose lessons are replaced; None = all
+                    snapshot_groups = snapshot_teachers = None
+                    if semester or group:
+                        old_owners = db.session.query(Schedule.group_name, Schedule.teacher_name) \
+                            .filter_by(**filters).distinct().all()
+                        snapshot_groups = {group_name for group_name, _ in old_owners}
+                        snapshot_teachers = {teacher_name for _, teacher_name in old_owners}
+                        Schedule.query.filter_by(**filters).delete()
+                    else:
+                        db.session.execute(db.text("TRUNCATE TABLE schedule"))
 
                     db.session.commit()
-                    db.session.expire_all()
-                    total_records += len(records)
 
-            flash(f'Schedule successfully synced. Processed {total_records} entries.', 'success')
+                    while True:
+                        records = cursor.fetchmany(batch_size)
+                        if not records: break
+                        insert_schedule_records(records)
+                        for record in records:
+                            if snapshot_groups is not None:
+                                snapshot_groups.add(record['group_name'])
+                                snapshot_teachers.add(record['teacher_name'])
+
+                            # Check for changes only if syncing a specific group
+                            if group:
+                                key = f"{record['date']}_{record['time_start']}_{record['subject']}_{record['group_name']}"
+                                old_schedule = current_schedules.get(key)
+                                if old_schedule:
+                                    changed = False
+                                    changes = {}
+                                    if old_schedule.teacher_name != record['teacher_name']:
+                                        changed = True
+                                        changes['teacher'] = {'old': old_schedule.teacher_name,'new': record['teacher_name']}
+                                    if old_schedule.auditory != record['auditory']:
+                                        changed = True
+                                        changes['auditory'] = {'old': old_schedule.auditory,'new': record['auditory']}
+                                    if old_schedule.time_start != record['time_start'] or old_schedule.time_end != record['time_end']:
+                                        changed = True
+                                        changes['time'] = {'old': f"{old_schedule.time_start}-{old_schedule.time_end}",'new': f"{record['time_start']}-{record['time_end']}"}
+
+                                    if changed:
+                                        changes_detected = True
+                                        group_name = record['group_name']
+                                        if group_name not in changes_by_group:
+                                            changes_by_group[group_name] = []
+                                        changes_by_group[group_name].append({
+                                            'date': record['date'].strftime('%d.%m.%Y') if hasattr(record['date'],'strftime') else str(record['date']),
+                                            'subject': record['subject'],
+                                            'changes': changes,
+                                            'schedule_id': old_schedule.id
+                                        })
+
+                        db.session.commit()
+                        total_records += len(records)
+
+            rebuild_group_catalog()
+            snapshot_stats = rebuild_schedule_snapshots(groups=snapshot_groups, teacher_names=snapshot_teachers)
+            db.session.commit()
+            app.logger.info("Schedule snapshots rebuilt: %s", snapshot_stats)
+
+            if sync_stats:
+                flash(f"Schedule successfully synced. Processed {total_records} entries: "
+                      f"{sync_stats['inserted']} added, {sync_stats['updated']} updated, "
+                      f"{sync_stats['deleted']} deleted, {sync_stats['unchanged']} unchanged.", 'success')
+            else:
+                flash(f'Schedule successfully synced. Processed {total_records} entries.', 'success')
             sync_success = True
 
             if changes_detected:
@@ -736,7 +792,8 @@ def sync_schedule():
                                changes_detected=changes_detected,
                                changes_by_group=changes_by_group,
                                synced_semester=semester, # Pass back the synced semester/group for form
-                               synced_group=group)
+                               synced_group=group,
+                               sync_stats=sync_stats)
 
     return render_template('schedule/sync.html',
                            semesters=get_semesters_from_db(),
@@ -890,13 +947,7 @@ def student_verification_list():
         query = query.filter_by(verification_status=status)
 
     if search_query:
-        query = query.filter(
-            db.or_(
-                User.username.ilike(f'%{search_query}%'),
-                User.full_name.ilike(f'%{search_query}%'),
-                User.group.ilike(f'%{search_query}%')
-            )
-        )
+        query = apply_user_search(query, search_query)
 
     pagination = query.order_by(User.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
@@ -1620,14 +1671,7 @@ def search_users():
         return jsonify([])
 
     try:
-        # Используем or_ для поиска по нескольким полям
-        users = User.query.filter(
-            db.or_(
-                User.full_name.ilike(f'%{search_term}%'),
-                User.username.ilike(f'%{search_term}%'),
-                User.email.ilike(f'%{search_term}%')
-            )
-        ).limit(10).all()
+        users = apply_user_search(User.query, search_term).limit(10).all()
 
         results = []
         for user in users:
@@ -1706,7 +1750,12 @@ def get_notification_recipients(filter_data):
         student_group = filter_data.get('student_group')
         if student_group: query = query.filter(User.group == student_group)
         student_course = filter_data.get('student_course')
-        if student_course: query = query.filter(User.group.like(f'{student_course}%'))
+        if student_course:
+            try:
+                course_groups = group_catalog.groups_for_course(int(student_course))
+            except ValueError:
+                course_groups = []
+            query = query.filter(User.group.in_(course_groups))
         student_faculty = filter_data.get('student_faculty')
         if student_faculty: query = query.filter(User.faculty == student_faculty)
         verification_status = filter_data.get('verification_status')
@@ -1919,6 +1968,9 @@ if __name__ == '__main__':
                     print("Tables not found. Creating DB structure...")
                     db.create_all()
                     print("DB structure created")
+                else:
+                    # Creates tables added after the initial setup (news_article, ...); existing ones are untouched
+                    db.create_all()
 
                 # Check and add missing columns if needed
                 with db.engine.connect() as connection:
@@ -0,0 +1,118 @@
+"""
+In-process cache of decoded JWTs and user snapshots for token_required.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from werkzeug.security import check_password_hash
+
+from db import db
+from models import User
+
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+class UserSnapshot:
+    """Read-only copy of a User row's columns, shared between requests.
+
+    Endpoints that change the user must load the ORM object (db.session.get(User, id));
+    assigning to a snapshot raises AttributeError instead of silently losing the change.
+    """
+
+    def __init__(self, user):
+        for key in _USER_COLUMNS:
+            object.__setattr__(self, key, getattr(user, key))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"UserSnapshot is read-only (tried to set {name})")
+
+    def check_password(self, password):
+        return check_password_hash(self.password, password)
+
+
+class AuthCache:
+    """Bounded TTL cache: bearer token -> (user id, expiry) and user id -> UserSnapshot.
+
+    Snapshots live at most ttl seconds; user changes are dropped earlier through
+    invalidate_user(), which is wired to the 'user' invalidation scope.
+    """
+
+    def __init__(self, ttl, max_size, name='auth'):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.name = name
+
+        self._tokens = OrderedDict()  # token -> (user_id, exp)
+        self._users = OrderedDict()  # user_id -> (snapshot, stored_at)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_user(self, token, secret_key):
+        """Returns the snapshot of the token's user, or None if the user does not exist.
+
+        Raises the same jwt exceptions as jwt.decode for invalid or expired tokens.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is not None:
+                self._tokens.move_to_end(token)
+        if entry is None or (entry[1] is not None and entry[1] <= now):
+            payload = jwt.decode(token, secret_key, algorithms=['HS256'])
+            entry = (str(payload['sub']), payload.get('exp'))
+            with self._lock:
+                self._tokens[token] = entry
+                self._trim(self._tokens)
+
+        user_id = entry[0]
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and time.monotonic() - cached[1] <= self.ttl:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        snapshot = UserSnapshot(user)
+        with self._lock:
+            self._users[user_id] = (snapshot, time.monotonic())
+            self._trim(self._users)
+        return snapshot
+
+    def invalidate_user(self, user_id=None):
+        """Drops one user's snapshot, or all of them when user_id is None."""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(str(user_id), None)
+
+    def stats(self):
+        """Returns hit/miss counters and the current sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'tokens': len(self._tokens),
+                'users': len(self._users),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'invalidations': self.invalidations,
+            }
+
+    def _trim(self, entries):
+        # Caller holds self._lock
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
@@ -0,0 +1,127 @@
+"""
+Benchmark of the lxml news parser against the previous BeautifulSoup path.
+
+Works on melsu.ru pages saved as HTML fixtures:
+    <fixtures_dir>/listing-<page>.html    news listing pages (/news?page=N)
+    <fixtures_dir>/detail-<id>.html       article pages (/news/show/<id>)
+
+tests/fixtures/news has one listing page and one article rebuilt by hand from
+the melsu.ru page structure (not downloaded pages); tests/test_news_parser.py
+checks the two parsers agree on them. Save live pages with --download:
+
+Usage:
+    python bench_news_parser.py tests/fixtures/news --repeat 50
+    python bench_news_parser.py fixtures/news --download 3   # save listing pages 1..3 and their articles first
+
+The "bs4" detail path is what get_news_detail used to do: parse_news_detail
+(html.parser, content reparsed for content_text) followed by
+parse_news_detail_for_mobile on content_html. The "lxml" path is a single
+news_parser.parse_news_detail call. Output differences are reported as well.
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import time
+
+import news_parser
+import news_parser_bs4
+
+DETAIL_FIELDS = ('title', 'date', 'category', 'content_text', 'header_image_src', 'prev_article', 'next_article')
+
+
+def download_fixtures(fixtures_dir, pages):
+    from upstream import http_session
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for page in range(1, pages + 1):
+        listing_html = http_session.get(f"https://melsu.ru/news?page={page}", timeout=15).text
+        with open(os.path.join(fixtures_dir, f"listing-{page}.html"), 'w', encoding='utf-8') as f:
+            f.write(listing_html)
+        for item in news_parser.parse_news_listing(listing_html):
+            detail_html = http_session.get(f"https://melsu.ru/news/show/{item['id']}", timeout=15).text
+            with open(os.path.join(fixtures_dir, f"detail-{item['id']}.html"), 'w', encoding='utf-8') as f:
+                f.write(detail_html)
+        print(f"Saved listing page {page}")
+
+
+def load_fixtures(fixtures_dir, prefix):
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, f"{prefix}-*.html"))):
+        name = re.match(rf"{prefix}-(\w+)\.html$", os.path.basename(path)).group(1)
+        with open(path, 'r', encoding='utf-8') as f:
+            fixtures.append((name, f.read()))
+    return fixtures
+
+
+def old_detail(page_html, news_id):
+    detail = news_parser_bs4.parse_news_detail(page_html, news_id)
+    detail['content_blocks'] = news_parser_bs4.parse_news_detail_for_mobile(detail['content_html'])
+    return detail
+
+
+def measure(func, fixtures, repeat):
+    """Returns per-run timings (seconds) of calling func on every fixture."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for name, page_html in fixtures:
+            func(page_html, name)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label, fixtures, old_timings, new_timings):
+    per_page = 1000 / len(fixtures)
+    old_ms = statistics.median(old_timings) * per_page
+    new_ms = statistics.median(new_timings) * per_page
+    print(f"{label:8} {len(fixtures):4} pages   bs4 {old_ms:8.2f} ms/page   lxml {new_ms:8.2f} ms/page   "
+          f"speedup x{old_ms / new_ms:.1f}")
+
+
+def compare_outputs(listings, details):
+    mismatches = []
+    for name, page_html in listings:
+        if news_parser_bs4.parse_news_listing(page_html) != news_parser.parse_news_listing(page_html):
+            mismatches.append(f"listing-{name}")
+    for name, page_html in details:
+        old, new = old_detail(page_html, name), news_parser.parse_news_detail(page_html, name)
+        fields = [field for field in DETAIL_FIELDS + ('content_blocks',) if old.get(field) != new.get(field)]
+        if fields:
+            mismatches.append(f"detail-{name} ({', '.join(fields)})")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the lxml news parser against the BeautifulSoup one')
+    parser.add_argument('fixtures_dir', help='Directory with listing-*.html and detail-*.html fixtures')
+    parser.add_argument('--download', type=int, metavar='PAGES', help='Save this many listing pages (and their articles) first')
+    parser.add_argument('--repeat', type=int, default=20, help='Number of timed runs over all fixtures')
+    args = parser.parse_args()
+
+    if args.download:
+        download_fixtures(args.fixtures_dir, args.download)
+
+    listings = load_fixtures(args.fixtures_dir, 'listing')
+    details = load_fixtures(args.fixtures_dir, 'detail')
+    if not listings and not details:
+        parser.error(f"No fixtures found in {args.fixtures_dir} (use --download)")
+
+    if listings:
+        report('listing', listings,
+               measure(lambda page_html, name: news_parser_bs4.parse_news_listing(page_html), listings, args.repeat),
+               measure(lambda page_html, name: news_parser.parse_news_listing(page_html), listings, args.repeat))
+    if details:
+        report('detail', details,
+               measure(old_detail, details, args.repeat),
+               measure(news_parser.parse_news_detail, details, args.repeat))
+
+    mismatches = compare_outputs(listings, details)
+    print(f"Output differences: {len(mismatches)}")
+    for mismatch in mismatches:
+        print(f"  {mismatch}")
+
+
+if __name__ == '__main__':
+    main()
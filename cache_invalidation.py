@@ -0,0 +1,145 @@
+"""
+Invalidation of in-process caches across the API and admin processes.
+
+api.py and app.py run as separate processes, each with its own in-memory caches.
+A change is announced by inserting a CacheInvalidation row in the same transaction
+as the change itself. Every process polls the table (at most once per
+CACHE_INVALIDATION_POLL_INTERVAL seconds, before a request) and calls the handlers
+registered for the row's scope. The process that made the change runs its handlers
+right after the commit.
+
+AUTO_INCREMENT ids are assigned at insert time, so a long transaction can commit a
+row with a lower id after rows with higher ids were already read. A poll therefore
+reads every row created in the last CACHE_INVALIDATION_WINDOW seconds and skips the
+ids it has delivered before, instead of reading "ids after the last one seen".
+A transaction that stays open longer than the window can still be missed, so the
+teacher index and the group catalog are also reloaded after a maximum age.
+
+Any process can publish, including command-line scripts that never poll. The
+cache_invalidation table is created by create_indexes.py, never on the request path.
+
+ORM changes to tracked models are announced automatically; anything done with bulk
+queries or raw SQL has to call invalidation_bus.publish() itself.
+"""
+import datetime
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db import db
+from models import CacheInvalidation, User, Teacher, ScheduleTeacher
+
+RETENTION = datetime.timedelta(days=1)
+
+
+class InvalidationBus:
+    """Publishes and delivers cache invalidations by scope (e.g. 'user') and key (e.g. a user id)."""
+
+    def __init__(self):
+        self.poll_interval = 2
+        self.window = datetime.timedelta(seconds=300)
+        self._handlers = defaultdict(list)
+        self._tracked = []  # (model, scope, include_new)
+        self._seen = {}  # id -> created_at of the rows within the window that were delivered
+        self._next_poll = 0
+        self._next_purge = 0
+        self._lock = threading.Lock()
+
+        event.listen(Session, 'before_flush', self._before_flush)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_rollback', self._after_rollback)
+
+    def init_app(self, app):
+        """Starts polling for invalidations before each request of the app."""
+        self.poll_interval = app.config['CACHE_INVALIDATION_POLL_INTERVAL']
+        self.window = datetime.timedelta(seconds=app.config['CACHE_INVALIDATION_WINDOW'])
+        app.before_request(self.poll)
+
+    def register(self, scope, handler):
+        """Calls handler(key) for every invalidation in scope; key is None for 'everything'."""
+        self._handlers[scope].append(handler)
+
+    def track(self, model, scope, include_new=False):
+        """Publishes (scope, obj.id) whenever an instance of model is changed or deleted through the ORM."""
+        self._tracked.append((model, scope, include_new))
+
+    def publish(self, scope, key=None, session=None):
+        """Announces a change; it is delivered when the session commits."""
+        session = session or db.session
+        entry = (scope, str(key) if key is not None else None)
+        pending = session.info.setdefault('cache_invalidations', set())
+        if entry in pending:
+            return
+        pending.add(entry)
+        session.add(CacheInvalidation(scope=entry[0], key=entry[1]))
+
+    def poll(self):
+        """Delivers invalidations of the last window that this process has not delivered yet."""
+        now = time.monotonic()
+        if now < self._next_poll:
+            return
+        with self._lock:
+            if now < self._next_poll:
+                return
+            self._next_poll = now + self.poll_interval
+            cutoff = datetime.datetime.utcnow() - self.window
+            try:
+                rows = db.session.query(
+                    CacheInvalidation.id, CacheInvalidation.scope, CacheInvalidation.key, CacheInvalidation.created_at
+                ).filter(CacheInvalidation.created_at >= cutoff) \
+                    .order_by(CacheInvalidation.id) \
+                    .all()
+                if now >= self._next_purge:
+                    self._next_purge = now + 3600
+                    CacheInvalidation.query \
+                        .filter(CacheInvalidation.created_at < datetime.datetime.utcnow() - RETENTION) \
+                        .delete(synchronize_session=False)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error polling cache invalidations: {str(e)}")
+                return
+
+            for row_id, scope, key, created_at in rows:
+                if row_id in self._seen:
+                    continue
+                self._seen[row_id] = created_at
+                self._deliver(scope, key)
+            self._seen = {row_id: created_at for row_id, created_at in self._seen.items() if created_at >= cutoff}
+
+    def _deliver(self, scope, key):
+        for handler in self._handlers.get(scope, []):
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"Error invalidating cache {scope}:{key}: {str(e)}")
+
+    def _before_flush(self, session, flush_context, instances):
+        if not self._tracked:
+            return
+        for model, scope, include_new in self._tracked:
+            changed = [obj for obj in session.dirty if isinstance(obj, model) and session.is_modified(obj)]
+            changed += [obj for obj in session.deleted if isinstance(obj, model)]
+            for obj in changed:
+                self.publish(scope, obj.id, session=session)
+            if include_new and any(isinstance(obj, model) for obj in session.new):
+                self.publish(scope, None, session=session)
+
+    def _after_commit(self, session):
+        for scope, key in session.info.pop('cache_invalidations', ()):
+            self._deliver(scope, key)
+
+    def _after_rollback(self, session):
+        session.info.pop('cache_invalidations', None)
+
+
+invalidation_bus = InvalidationBus()
+
+# Cached user snapshots (auth_cache.py) are dropped on any ORM change or deletion of a User
+invalidation_bus.track(User, 'user')
+# The teacher search index (teacher_index.py) is rebuilt after teacher changes and matching
+invalidation_bus.track(Teacher, 'teachers', include_new=True)
+invalidation_bus.track(ScheduleTeacher, 'teachers', include_new=True)
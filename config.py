@@ -6,4 +6,81 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 SQLALCHEMY_ENGINE_OPTIONS = {
     'pool_recycle': 3600,
     'pool_pre_ping': True
-}
\ No newline at end of file
+}
+
+# News listing cache (stale-while-revalidate), seconds / number of pages
+NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL', 300))
+NEWS_CACHE_STALE_TTL = int(os.environ.get('NEWS_CACHE_STALE_TTL', 3600))
+NEWS_CACHE_MAX_PAGES = int(os.environ.get('NEWS_CACHE_MAX_PAGES', 50))
+
+# Local news store (filled by news_crawler.py)
+NEWS_PAGE_SIZE = int(os.environ.get('NEWS_PAGE_SIZE', 12))
+
+# Memo of parsed news content blocks; set CONTENT_BLOCKS_CACHE_DIR to also keep them on disk
+CONTENT_BLOCKS_CACHE_SIZE = int(os.environ.get('CONTENT_BLOCKS_CACHE_SIZE', 512))
+CONTENT_BLOCKS_CACHE_DIR = os.environ.get('CONTENT_BLOCKS_CACHE_DIR') or None
+
+# Disk cache for /api/image-proxy (least recently used images are evicted above the size limit)
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', os.path.join('cache', 'images'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE', 86400))
+
+# Pooled HTTP session to melsu.ru and limits of the streaming image proxy
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 32))
+IMAGE_PROXY_MAX_BYTES = int(os.environ.get('IMAGE_PROXY_MAX_BYTES', 15 * 1024 * 1024))
+IMAGE_PROXY_CHUNK_SIZE = int(os.environ.get('IMAGE_PROXY_CHUNK_SIZE', 64 * 1024))
+
+# Resized variants served by /api/image-proxy?w=&h=&format= and the thumbnail size used in /api/news
+IMAGE_RESIZE_WORKERS = int(os.environ.get('IMAGE_RESIZE_WORKERS', os.cpu_count() or 2))
+IMAGE_RESIZE_MAX_DIMENSION = int(os.environ.get('IMAGE_RESIZE_MAX_DIMENSION', 2048))
+IMAGE_RESIZE_QUALITY = int(os.environ.get('IMAGE_RESIZE_QUALITY', 80))
+NEWS_THUMBNAIL_WIDTH = int(os.environ.get('NEWS_THUMBNAIL_WIDTH', 720))
+NEWS_THUMBNAIL_FORMAT = os.environ.get('NEWS_THUMBNAIL_FORMAT', 'webp')
+# Longest time a request waits for an identical in-flight upstream fetch before fetching itself, seconds
+UPSTREAM_COALESCE_TIMEOUT = int(os.environ.get('UPSTREAM_COALESCE_TIMEOUT', 30))
+
+# Per-host circuit breaker for melsu.ru: open after N consecutive failures, retry after the timeout (seconds)
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get('UPSTREAM_BREAKER_FAILURES', 5))
+UPSTREAM_BREAKER_RESET_TIMEOUT = int(os.environ.get('UPSTREAM_BREAKER_RESET_TIMEOUT', 30))
+UPSTREAM_BREAKER_HALF_OPEN_CALLS = int(os.environ.get('UPSTREAM_BREAKER_HALF_OPEN_CALLS', 1))
+
+# Hosts (subdomains included) that upstream_get and /api/image-proxy may fetch from, comma-separated
+UPSTREAM_ALLOWED_HOSTS = os.environ.get('UPSTREAM_ALLOWED_HOSTS', 'melsu.ru').lower().split(',')
+
+# Background warm-up of article pages and header images listed by /api/news
+NEWS_PREFETCH_ENABLED = os.environ.get('NEWS_PREFETCH_ENABLED', '1') == '1'
+NEWS_PREFETCH_WORKERS = int(os.environ.get('NEWS_PREFETCH_WORKERS', 2))
+NEWS_PREFETCH_DELAY = float(os.environ.get('NEWS_PREFETCH_DELAY', 0.5))
+NEWS_PREFETCH_MAX_PENDING = int(os.environ.get('NEWS_PREFETCH_MAX_PENDING', 100))
+
+# In-process cache of decoded tokens and user snapshots used by token_required
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 300))
+AUTH_CACHE_MAX_SIZE = int(os.environ.get('AUTH_CACHE_MAX_SIZE', 10000))
+
+# In-process cache of /api/user/profile payloads
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 600))
+PROFILE_CACHE_MAX_SIZE = int(os.environ.get('PROFILE_CACHE_MAX_SIZE', 10000))
+
+# How often each process checks the cache_invalidation table, seconds
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.environ.get('CACHE_INVALIDATION_POLL_INTERVAL', 2))
+# Invalidations created this many seconds back are re-read by every poll (longer than any write transaction)
+CACHE_INVALIDATION_WINDOW = int(os.environ.get('CACHE_INVALIDATION_WINDOW', 300))
+
+# Seconds after which the teacher search index and the group catalog are reloaded even without an invalidation
+TEACHER_INDEX_MAX_AGE = int(os.environ.get('TEACHER_INDEX_MAX_AGE', 3600))
+GROUP_CATALOG_MAX_AGE = int(os.environ.get('GROUP_CATALOG_MAX_AGE', 3600))
+
+# Bulk teacher account provisioning: password hashing processes and accounts per INSERT batch
+TEACHER_PROVISION_WORKERS = int(os.environ.get('TEACHER_PROVISION_WORKERS', os.cpu_count() or 2))
+TEACHER_PROVISION_BATCH_SIZE = int(os.environ.get('TEACHER_PROVISION_BATCH_SIZE', 200))
+
+# /api/users keyset pagination (used when the client passes limit= or cursor=)
+USERS_PAGE_SIZE = int(os.environ.get('USERS_PAGE_SIZE', 100))
+USERS_PAGE_MAX_SIZE = int(os.environ.get('USERS_PAGE_MAX_SIZE', 500))
+
+# /api/schedule keyset pagination; a week= request gets up to the max size in one page
+SCHEDULE_PAGE_SIZE = int(os.environ.get('SCHEDULE_PAGE_SIZE', 100))
+SCHEDULE_PAGE_MAX_SIZE = int(os.environ.get('SCHEDULE_PAGE_MAX_SIZE', 500))
+
+# Rows per fetch from the source database and per INSERT/UPDATE batch of sync_schedule
+SCHEDULE_SYNC_BATCH_SIZE = int(os.environ.get('SCHEDULE_SYNC_BATCH_SIZE', 5000))
@@ -1,5 +1,6 @@
 from flask import Flask
 from db import db
+from models import CacheInvalidation, GroupInfo, NewsArticle, ScheduleSnapshot, news_search_index, user_search_index
 from sqlalchemy import text
 
 app = Flask(__name__)
@@ -38,8 +39,34 @@ def create_indexes():
         db.session.execute(text(
             "CREATE INDEX IF NOT EXISTS idx_schedule_semester_group ON schedule (semester, group_name)"
         ))
+        # Date-range and keyset paging of /api/schedule (see schedule_query.py)
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_schedule_group_date_time ON schedule (group_name, date, time_start)"
+        ))
+
+        # Prefix search (q=) of the /api/users directory
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_user_full_name ON user (full_name)"
+        ))
 
         db.session.commit()
+
+        # Group catalog (group_catalog.py), filled by the schedule sync
+        GroupInfo.__table__.create(db.engine, checkfirst=True)
+        # Week snapshots of /api/schedule (schedule_snapshots.py), filled by the schedule sync
+        ScheduleSnapshot.__table__.create(db.engine, checkfirst=True)
+        # Cross-process cache invalidations (cache_invalidation.py), polled before every request
+        CacheInvalidation.__table__.create(db.engine, checkfirst=True)
+
+        # Full-text index for news search
+        NewsArticle.__table__.create(db.engine, checkfirst=True)
+        with db.engine.begin() as connection:
+            news_search_index.create(connection)
+
+        # Full-text index for the admin user search
+        with db.engine.begin() as connection:
+            user_search_index.create(connection)
+
         print("Indexes created successfully.")
 
 
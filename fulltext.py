@@ -0,0 +1,224 @@
+"""
+Full-text search over table columns, for whichever database the app runs on.
+
+MySQL   FULLTEXT index WITH PARSER ngram (works for Russian without stemming),
+        queried with MATCH ... AGAINST in boolean mode, ranked by relevance.
+SQLite  FTS5 sidecar table "<table>_fts" with external content, kept in sync by
+        triggers and ranked with bm25().
+Other   LIKE over the columns, newest rows first (no ranking).
+
+Indexes are created by create_indexes.py (and the news crawler), never on a
+request path; until then search() falls back to LIKE.
+"""
+import re
+import threading
+import time
+
+from sqlalchemy import Float, Integer, text
+
+# Characters with a meaning in MySQL boolean mode / FTS5 query syntax
+_QUERY_SPECIAL_RE = re.compile(r'[+\-<>()~*"@:^{}\[\],.;!?\'`\\/|&%_]+')
+
+
+def query_terms(query_text, max_terms=8):
+    """Splits user input into plain search terms (operators stripped)."""
+    return [term for term in _QUERY_SPECIAL_RE.sub(' ', query_text or '').split() if term][:max_terms]
+
+
+class FullTextIndex:
+    """Full-text index over some text columns of a table with an integer primary key."""
+
+    def __init__(self, table_name, columns, name, id_column='id', weights=None):
+        self.table_name = table_name
+        self.columns = list(columns)
+        self.name = name
+        self.id_column = id_column
+        # Relative column weights for SQLite bm25(); MySQL ranks all columns equally
+        self.weights = weights or [1.0] * len(self.columns)
+        self.fts_table = f"{table_name}_fts"
+
+        self._exists = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    # --- creation ---------------------------------------------------------
+
+    def create(self, connection):
+        """Creates the index if it does not exist yet (idempotent)."""
+        dialect = connection.dialect.name
+        if dialect == 'mysql':
+            self._create_mysql(connection)
+        elif dialect == 'sqlite':
+            self._create_sqlite(connection)
+        else:
+            print(f"Full-text index {self.name}: not supported on {dialect}, LIKE search will be used")
+        self._exists = None
+
+    def _create_mysql(self, connection):
+        if self._index_present(connection):
+            return
+        quote = connection.dialect.identifier_preparer.quote
+        columns = ', '.join(quote(column) for column in self.columns)
+        connection.execute(text(
+            f"ALTER TABLE {quote(self.table_name)} ADD FULLTEXT INDEX {self.name} ({columns}) WITH PARSER ngram"
+        ))
+        print(f"Full-text index {self.name} created on {self.table_name} ({columns})")
+
+    def _create_sqlite(self, connection):
+        if self._index_present(connection):
+            return
+
+        quote = connection.dialect.identifier_preparer.quote
+        table, fts, rowid = quote(self.table_name), self.fts_table, self.id_column
+        columns = ', '.join(quote(column) for column in self.columns)
+        new_values = ', '.join(f"new.{quote(column)}" for column in self.columns)
+        old_values = ', '.join(f"old.{quote(column)}" for column in self.columns)
+
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{self.table_name}', content_rowid='{rowid}', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{rowid}, {new_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_values}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{rowid}, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{rowid}, {new_values}); END"
+        ))
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        print(f"Full-text index {fts} created for {table} ({columns})")
+
+    def exists(self, connection):
+        """Returns True if the index has been created.
+
+        A positive answer is cached for the life of the process, a negative one for a minute,
+        so an index created by create_indexes.py is picked up without a restart.
+        """
+        with self._lock:
+            if self._exists is None or (not self._exists and time.monotonic() - self._checked_at > 60):
+                self._checked_at = time.monotonic()
+                self._exists = self._index_present(connection)
+                if not self._exists:
+                    print(f"Full-text index {self.name} is missing (run create_indexes.py), using LIKE search")
+            return self._exists
+
+    def _index_present(self, connection):
+        dialect = connection.dialect.name
+        if dialect == 'mysql':
+            return bool(connection.execute(text(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :name"
+            ), {'table': self.table_name, 'name': self.name}).scalar())
+        if dialect == 'sqlite':
+            return bool(connection.execute(text(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': self.fts_table}).scalar())
+        return False
+
+    # --- search -----------------------------------------------------------
+
+    def search(self, connection, query_text, limit, offset=0):
+        """Returns (ids, total): matching primary keys, best matches first, and the match count."""
+        terms = query_terms(query_text)
+        if not terms:
+            return [], 0
+
+        dialect = connection.dialect.name
+        if dialect in ('mysql', 'sqlite') and self.exists(connection):
+            if dialect == 'mysql':
+                return self._search_mysql(connection, terms, limit, offset)
+            return self._search_sqlite(connection, terms, limit, offset)
+        return self._search_like(connection, terms, limit, offset)
+
+    def match_subquery(self, connection, query_text, name='fulltext_match'):
+        """Returns a subquery of all matches as (id, score), a higher score being better; None without terms.
+
+        Join it to the table (or outer-join and filter on it) to combine the match with
+        other predicates in one statement, so they are not applied to a pre-limited id list.
+        """
+        terms = query_terms(query_text)
+        if not terms:
+            return None
+
+        dialect = connection.dialect.name
+        if dialect in ('mysql', 'sqlite') and self.exists(connection):
+            if dialect == 'mysql':
+                match, params = self._mysql_match(connection, terms)
+                sql = f"SELECT {self.id_column} AS id, {match} AS score FROM {self._quoted_table(connection)} WHERE {match}"
+            else:
+                params = self._sqlite_params(terms)
+                # bm25() is lower for better matches
+                sql = (f"SELECT rowid AS id, -bm25({self.fts_table}, {self._sqlite_weights()}) AS score "
+                       f"FROM {self.fts_table} WHERE {self.fts_table} MATCH :query")
+        else:
+            where, params = self._like_where(connection, terms)
+            sql = f"SELECT {self.id_column} AS id, 0 AS score FROM {self._quoted_table(connection)} WHERE {where}"
+        return text(sql).bindparams(**params).columns(id=Integer, score=Float).subquery(name)
+
+    def _quoted_table(self, connection):
+        return connection.dialect.identifier_preparer.quote(self.table_name)
+
+    def _mysql_match(self, connection, terms):
+        # Every term is a required phrase; with the ngram parser that matches substrings of words
+        quote = connection.dialect.identifier_preparer.quote
+        match = f"MATCH({', '.join(quote(column) for column in self.columns)}) AGAINST (:query IN BOOLEAN MODE)"
+        return match, {'query': ' '.join(f'+"{term}"' for term in terms)}
+
+    def _sqlite_params(self, terms):
+        # Prefix match on every term, all terms required
+        return {'query': ' '.join(f'"{term}"*' for term in terms)}
+
+    def _sqlite_weights(self):
+        return ', '.join(str(weight) for weight in self.weights)
+
+    def _like_where(self, connection, terms):
+        quote = connection.dialect.identifier_preparer.quote
+        conditions = []
+        params = {}
+        for i, term in enumerate(terms):
+            params[f"term{i}"] = f"%{term}%"
+            conditions.append('(' + ' OR '.join(f"{quote(column)} LIKE :term{i}" for column in self.columns) + ')')
+        return ' AND '.join(conditions), params
+
+    def _search_mysql(self, connection, terms, limit, offset):
+        table = self._quoted_table(connection)
+        match, params = self._mysql_match(connection, terms)
+        params.update(limit=limit, offset=offset)
+        total = connection.execute(text(
+            f"SELECT COUNT(*) FROM {table} WHERE {match}"
+        ), params).scalar()
+        rows = connection.execute(text(
+            f"SELECT {self.id_column} FROM {table} WHERE {match} "
+            f"ORDER BY {match} DESC, {self.id_column} DESC LIMIT :limit OFFSET :offset"
+        ), params).fetchall()
+        return [row[0] for row in rows], total
+
+    def _search_sqlite(self, connection, terms, limit, offset):
+        params = dict(self._sqlite_params(terms), limit=limit, offset=offset)
+        total = connection.execute(text(
+            f"SELECT COUNT(*) FROM {self.fts_table} WHERE {self.fts_table} MATCH :query"
+        ), params).scalar()
+        rows = connection.execute(text(
+            f"SELECT rowid FROM {self.fts_table} WHERE {self.fts_table} MATCH :query "
+            f"ORDER BY bm25({self.fts_table}, {self._sqlite_weights()}), rowid DESC LIMIT :limit OFFSET :offset"
+        ), params).fetchall()
+        return [row[0] for row in rows], total
+
+    def _search_like(self, connection, terms, limit, offset):
+        table = self._quoted_table(connection)
+        where, params = self._like_where(connection, terms)
+        params.update(limit=limit, offset=offset)
+        total = connection.execute(text(
+            f"SELECT COUNT(*) FROM {table} WHERE {where}"
+        ), params).scalar()
+        rows = connection.execute(text(
+            f"SELECT {self.id_column} FROM {table} WHERE {where} "
+            f"ORDER BY {self.id_column} DESC LIMIT :limit OFFSET :offset"
+        ), params).fetchall()
+        return [row[0] for row in rows], total
@@ -0,0 +1,137 @@
+"""
+Catalog of schedule groups (course, faculty, semester, subgroups).
+
+The group_info table (created by create_indexes.py) is rebuilt from the
+schedule table after every sync (rebuild_group_catalog), or by hand:
+
+    python group_catalog.py
+
+Each process keeps the whole catalog in memory as a dict, so "which course
+is group X" no longer scans the schedule table, and "which groups are in
+course N" is exact. Until the table has been built, the catalog is derived
+with the same DISTINCT query over the schedule table, without storing it.
+The snapshot is reloaded after a rebuild in any process ('group_info'
+invalidation scope) and once it is older than GROUP_CATALOG_MAX_AGE seconds.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import insert
+
+from cache_invalidation import invalidation_bus
+from db import db
+from models import GroupInfo, Schedule
+
+
+def compute_group_catalog():
+    """Returns the group_info rows (as dicts) derived from the schedule table.
+
+    Every group is described by its latest semester: the highest course and the
+    subgroups seen in that semester.
+    """
+    rows = db.session.query(
+        Schedule.group_name, Schedule.semester, Schedule.course, Schedule.faculty, Schedule.subgroup
+    ).distinct().all()
+
+    by_group = defaultdict(list)
+    for row in rows:
+        if row.group_name:
+            by_group[row.group_name].append(row)
+
+    catalog = []
+    for group_name, group_rows in by_group.items():
+        semester = max((row.semester for row in group_rows if row.semester is not None), default=None)
+        latest = [row for row in group_rows if row.semester == semester] or group_rows
+        faculties = sorted({row.faculty for row in latest if row.faculty})
+        subgroups = sorted({row.subgroup for row in latest if row.subgroup})
+        catalog.append({
+            'group_name': group_name,
+            'course': max((row.course for row in latest if row.course is not None), default=None),
+            'faculty': faculties[0] if faculties else None,
+            'semester': semester,
+            'subgroups': ','.join(str(subgroup) for subgroup in subgroups),
+        })
+    return catalog
+
+
+def rebuild_group_catalog():
+    """Recomputes group_info from the schedule table; the caller commits."""
+    catalog = compute_group_catalog()
+    GroupInfo.query.delete(synchronize_session=False)
+    if catalog:
+        db.session.execute(insert(GroupInfo), catalog)
+    invalidation_bus.publish('group_info')
+    return len(catalog)
+
+
+class GroupCatalog:
+    """In-memory snapshot of group_info, keyed by lowercase group name."""
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._groups = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, group_name):
+        """Returns the group's dict (see GroupInfo.to_dict) or None."""
+        if not group_name:
+            return None
+        return self._snapshot().get(group_name.strip().lower())
+
+    def course_of(self, group_name):
+        """Returns the group's course or None."""
+        group = self.get(group_name)
+        return group['course'] if group else None
+
+    def groups_for_course(self, course):
+        """Returns the names of all groups in the course."""
+        return [group['group_name'] for group in self._snapshot().values() if group['course'] == course]
+
+    def init_app(self, app):
+        """Reads GROUP_CATALOG_MAX_AGE from the app config."""
+        self.max_age = app.config['GROUP_CATALOG_MAX_AGE']
+
+    def invalidate(self, key=None):
+        """Drops the snapshot; the next lookup reloads it."""
+        with self._lock:
+            self._groups = None
+
+    def _snapshot(self):
+        groups = self._groups
+        if groups is None or time.monotonic() >= self._expires_at:
+            with self._lock:
+                if self._groups is None or time.monotonic() >= self._expires_at:
+                    self._groups = self._load()
+                    self._expires_at = time.monotonic() + self.max_age
+                groups = self._groups
+        return groups if groups is not None else {}
+
+    def _load(self):
+        try:
+            rows = GroupInfo.query.all()
+            if not rows:
+                # Not built yet (no sync since the table was created): derive it without storing it
+                rows = [GroupInfo(**group) for group in compute_group_catalog()]
+            return {row.group_name.strip().lower(): row.to_dict() for row in rows}
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error loading group catalog: {str(e)}")
+            return None
+
+
+group_catalog = GroupCatalog()
+invalidation_bus.register('group_info', group_catalog.invalidate)
+
+if __name__ == '__main__':
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object('config')
+    db.init_app(app)
+
+    with app.app_context():
+        count = rebuild_group_catalog()
+        db.session.commit()
+        print(f"Group catalog rebuilt: {count} groups")
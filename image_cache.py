@@ -0,0 +1,251 @@
+"""
+Content-addressed disk cache for images proxied from the university website.
+"""
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def normalize_image_url(url):
+    """Normalizes an upstream URL so that equivalent spellings share one cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = quote(unquote(parts.path or '/'), safe="/:@!$&'()*+,;=-._~")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class ImageDiskCache:
+    """Disk cache of upstream images with size-based LRU eviction.
+
+    Files are stored under cache_dir/<key[:2]>/<key> with a <key>.json metadata file,
+    where key is sha256 of the normalized URL (plus the variant name for resized copies).
+    The ETag is a hash of the image bytes.
+    Recency is tracked through file mtimes, so the LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir, max_bytes, name='image-cache'):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.name = name
+
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def key_for(self, url, variant=None):
+        """Returns the cache key for an upstream image URL (or a resized variant of it)."""
+        name = normalize_image_url(url)
+        if variant:
+            name = f"{name}\x1f{variant}"
+        return hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+    def get(self, url, variant=None):
+        """Returns the metadata of a cached image (with its file 'path'), or None on a miss."""
+        key = self.key_for(url, variant)
+        data_path, meta_path = self._paths(key)
+        meta = self._read_meta(meta_path)
+        if meta is None or not os.path.exists(data_path):
+            with self._lock:
+                self.misses += 1
+                self._forget(key)
+            return None
+
+        try:
+            os.utime(data_path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                # Stored by another worker process
+                self._entries[key] = meta['size']
+                self._total_bytes += meta['size']
+
+        meta['path'] = data_path
+        return meta
+
+    def contains(self, url, variant=None):
+        """Returns True if the image is cached (without touching hit/miss counters or recency)."""
+        _data_path, meta_path = self._paths(self.key_for(url, variant))
+        return os.path.exists(meta_path)
+
+    def put(self, url, content, content_type, last_modified=None, variant=None):
+        """Stores image bytes and returns their metadata (with 'path'), evicting old entries."""
+        writer = self.open_writer(url, content_type, last_modified, variant)
+        try:
+            writer.write(content)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def open_writer(self, url, content_type, last_modified=None, variant=None):
+        """Returns an ImageCacheWriter that stores an image chunk by chunk while it is streamed."""
+        key = self.key_for(url, variant)
+        data_path, _meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        return ImageCacheWriter(self, key, {
+            'url': normalize_image_url(url),
+            'variant': variant,
+            'content_type': content_type,
+            'last_modified': self._parse_http_date(last_modified) or time.time(),
+        })
+
+    def _commit(self, key, tmp_path, meta):
+        data_path, meta_path = self._paths(key)
+        os.replace(tmp_path, data_path)
+        self._write_atomic(meta_path, uuid.uuid4().hex, json.dumps(meta).encode('utf-8'))
+
+        with self._lock:
+            self.stores += 1
+            self._forget(key)
+            self._entries[key] = meta['size']
+            self._total_bytes += meta['size']
+            self._evict()
+
+        meta['path'] = data_path
+        return meta
+
+    def stats(self):
+        """Returns hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'stores': self.stores,
+                'evictions': self.evictions,
+            }
+
+    def _paths(self, key):
+        data_path = os.path.join(self.cache_dir, key[:2], key)
+        return data_path, f"{data_path}.json"
+
+    def _load_index(self):
+        found = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for file_name in files:
+                if file_name.endswith(('.json', '.tmp')):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, file_name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, file_name, stat.st_size))
+
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _forget(self, key):
+        # Caller holds self._lock
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        # Caller holds self._lock
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"[{self.name}] Error removing {path}: {str(e)}")
+
+    @staticmethod
+    def _write_atomic(path, suffix, data):
+        tmp_path = f"{path}.{suffix}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read_meta(self, meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[{self.name}] Error reading {meta_path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _parse_http_date(value):
+        if not value:
+            return None
+        if isinstance(value, (int, float)):
+            return value
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+
+
+class ImageCacheWriter:
+    """Writes one image into an ImageDiskCache; nothing is visible to readers before commit()."""
+
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self.size = 0
+        self._hash = hashlib.sha256()
+        data_path, _meta_path = cache._paths(key)
+        self._tmp_path = f"{data_path}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self._tmp_path, 'wb')
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self):
+        """Moves the image into the cache and returns its metadata (with 'path')."""
+        self._file.close()
+        meta = dict(self.meta, etag=self._hash.hexdigest()[:32], size=self.size, stored_at=time.time())
+        return self.cache._commit(self.key, self._tmp_path, meta)
+
+    def abort(self):
+        """Discards a partially written image."""
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,84 @@
+"""
+Resized and re-encoded variants of proxied images (thumbnails, WebP).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+import config
+
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+# Raised by render_image_variant for files Pillow cannot (or refuses to) decode; a
+# decompression bomb (more than twice Image.MAX_IMAGE_PIXELS) is not an OSError
+UNREADABLE_IMAGE_ERRORS = (OSError, Image.DecompressionBombError)
+
+# Pillow releases the GIL while decoding, resampling and encoding, so threads run in parallel
+resize_pool = ThreadPoolExecutor(max_workers=config.IMAGE_RESIZE_WORKERS, thread_name_prefix='image-resize')
+
+
+class ImageVariantError(ValueError):
+    """Raised for invalid w/h/format parameters."""
+
+
+def parse_variant_args(args):
+    """Reads w, h and format from request args.
+
+    Returns (width, height, output_format) or None when no variant was requested.
+    """
+    width = args.get('w')
+    height = args.get('h')
+    output_format = args.get('format')
+    if width is None and height is None and output_format is None:
+        return None
+
+    max_dimension = config.IMAGE_RESIZE_MAX_DIMENSION
+    dimensions = []
+    for name, value in (('w', width), ('h', height)):
+        if value is None or value == '':
+            dimensions.append(None)
+            continue
+        if not value.isdigit() or not 0 < int(value) <= max_dimension:
+            raise ImageVariantError(f"Parameter {name} must be an integer between 1 and {max_dimension}")
+        dimensions.append(int(value))
+
+    output_format = (output_format or 'jpeg').lower()
+    if output_format == 'jpg':
+        output_format = 'jpeg'
+    if output_format not in OUTPUT_FORMATS:
+        raise ImageVariantError("Parameter format must be 'webp' or 'jpeg'")
+
+    return dimensions[0], dimensions[1], output_format
+
+
+def variant_name(width, height, output_format):
+    """Stable name of a variant, used as part of its cache key."""
+    return f"w={width or 0};h={height or 0};format={output_format};q={config.IMAGE_RESIZE_QUALITY}"
+
+
+def render_image_variant(source_path, width, height, output_format):
+    """Scales an image down to fit into width x height (never up) and encodes it.
+
+    Returns (bytes, content_type).
+    """
+    pil_format, content_type = OUTPUT_FORMATS[output_format]
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if width or height:
+            image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+
+        if pil_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif pil_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+
+        output = BytesIO()
+        image.save(output, pil_format, quality=config.IMAGE_RESIZE_QUALITY, optimize=True)
+        return output.getvalue(), content_type
@@ -6,6 +6,7 @@ from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from db import db
+from fulltext import FullTextIndex
 
 
 # === User Model === #
@@ -53,6 +54,14 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 
+# Full-text index for the admin user search (created by create_indexes.py)
+user_search_index = FullTextIndex(
+    'user', ['username', 'full_name', 'group', 'email'],
+    name='ft_user_search',
+    weights=[5.0, 3.0, 5.0, 1.0]
+)
+
+
 # === Teacher Model === #
 
 class Teacher(db.Model):
@@ -71,60 +80,151 @@ class Teacher(db.Model):
     def __repr__(self):
         return f'<Teacher {self.name}>'
 
+    @staticmethod
+    def generate_password():
+        """Generates a random 8-character password."""
+        return ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+
+    @staticmethod
+    def random_login():
+        """Generates a fallback login when no variant of the name is free."""
+        return 'teacher_' + ''.join(random.choices(string.ascii_lowercase, k=6))
+
+    @staticmethod
+    def username_candidates(name):
+        """Returns login variants for a teacher's full name, most preferred first."""
+        if not name or not name.strip():
+            return []
+
+        try:
+            from transliterate import translit
+            latin_name = translit(name, 'ru', reversed=True)
+        except ImportError:
+            latin_name = name
+
+        latin_name = latin_name.lower()
+        import re
+        latin_name = re.sub(r'[^\w\s]', '', latin_name)
+
+        name_parts = latin_name.split()
+        username_formats = []
+
+        if len(name_parts) >= 1:
+            username_formats.append(f"{name_parts[0]}")
+        if len(name_parts) >= 2:
+            username_formats.append(f"{name_parts[0]}.{name_parts[1]}")
+        if len(name_parts) >= 2 and len(name_parts[1]) > 0:
+            username_formats.append(f"{name_parts[1][0]}{name_parts[0]}")
+        if len(name_parts) >= 2 and len(name_parts[1]) > 0:
+            username_formats.append(f"{name_parts[0]}{name_parts[1][0]}")
+        if len(name_parts) >= 2:
+            username_formats.append(f"{name_parts[1]}.{name_parts[0]}")
+        return username_formats
+
     @staticmethod
     def generate_credentials(name=None):
         """Generates username and password for a teacher."""
-        password = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+        password = Teacher.generate_password()
 
         if not name or not name.strip():
             login = ''.join(random.choices(string.ascii_lowercase, k=6))
             return login, password
 
+        from username_allocator import allocate_username
+
         try:
-            try:
-                from transliterate import translit
-                latin_name = translit(name, 'ru', reversed=True)
-            except ImportError:
-                latin_name = name
-
-            latin_name = latin_name.lower()
-            import re
-            latin_name = re.sub(r'[^\w\s]', '', latin_name)
-
-            name_parts = latin_name.split()
-            username_formats = []
-
-            if len(name_parts) >= 1:
-                username_formats.append(f"{name_parts[0]}")
-            if len(name_parts) >= 2:
-                username_formats.append(f"{name_parts[0]}.{name_parts[1]}")
-            if len(name_parts) >= 2 and len(name_parts[1]) > 0:
-                username_formats.append(f"{name_parts[1][0]}{name_parts[0]}")
-            if len(name_parts) >= 2 and len(name_parts[1]) > 0:
-                username_formats.append(f"{name_parts[0]}{name_parts[1][0]}")
-            if len(name_parts) >= 2:
-                username_formats.append(f"{name_parts[1]}.{name_parts[0]}")
-
-            for base_username in username_formats:
-                username = base_username
-                suffix = 1
-                while User.query.filter_by(username=username).first() is not None:
-                    username = f"{base_username}{suffix}"
-                    suffix += 1
-                    if suffix > 100:
-                        username = 'teacher_' + ''.join(random.choices(string.ascii_lowercase, k=6))
-                        break
-
-                if User.query.filter_by(username=username).first() is None:
-                    return username, password
-
-            username = 'teacher_' + ''.join(random.choices(string.ascii_lowercase, k=6))
+            username = allocate_username(Teacher.username_candidates(name), max_suffix=100, fallback=Teacher.random_login)
             return username, password
 
         except Exception as e:
             print(f"Error generating credentials: {str(e)}")
-            username = 'teacher_' + ''.join(random.choices(string.ascii_lowercase, k=6))
-            return username, password
+            return Teacher.random_login(), password
+
+
+# === News Models === #
+
+class NewsArticle(db.Model):
+    """News article mirrored from the university website"""
+    __tablename__ = 'news_article'
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    # Same id as in https://melsu.ru/news/show/<id>
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    title = db.Column(db.String(512, collation='utf8mb4_unicode_ci'))
+    date = db.Column(db.String(100, collation='utf8mb4_unicode_ci'))  # as displayed on the site
+    category = db.Column(db.String(255, collation='utf8mb4_unicode_ci'))
+    description = db.Column(db.Text(collation='utf8mb4_unicode_ci'))
+    url = db.Column(db.String(512, collation='utf8mb4_unicode_ci'))
+
+    # Image sources are stored as found on melsu.ru, proxy URLs are built per request
+    image_src = db.Column(db.String(1024, collation='utf8mb4_unicode_ci'))
+    header_image_src = db.Column(db.String(1024, collation='utf8mb4_unicode_ci'))
+
+    content_html = db.Column(db.Text(16777215, collation='utf8mb4_unicode_ci'))
+    content_text = db.Column(db.Text(16777215, collation='utf8mb4_unicode_ci'))
+    content_blocks = db.Column(db.Text(16777215, collation='utf8mb4_unicode_ci'))  # JSON
+    navigation = db.Column(db.Text(collation='utf8mb4_unicode_ci'))  # JSON with prev/next articles
+
+    # Change detection for the crawler
+    listing_hash = db.Column(db.String(64))
+    content_hash = db.Column(db.String(64))
+
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NewsArticle {self.id} {self.title}>'
+
+    def to_list_dict(self):
+        """Converts article to a news listing item (without image proxy URL)"""
+        return {
+            'id': str(self.id),
+            'title': self.title,
+            'category': self.category,
+            'date': self.date,
+            'description': self.description,
+            'url': self.url or f"https://melsu.ru/news/show/{self.id}",
+            '_debug_original_src': self.image_src,
+        }
+
+    def to_detail_dict(self):
+        """Converts article to the news detail payload (without image proxy URLs)"""
+        navigation = {}
+        if self.navigation:
+            try:
+                navigation = json.loads(self.navigation)
+            except json.JSONDecodeError:
+                pass
+
+        content_blocks = None
+        if self.content_blocks:
+            try:
+                content_blocks = json.loads(self.content_blocks)
+            except json.JSONDecodeError:
+                pass
+
+        return {
+            'id': str(self.id),
+            'title': self.title,
+            'date': self.date,
+            'category': self.category,
+            'content_html': self.content_html,
+            'content_text': self.content_text,
+            'header_image_src': self.header_image_src,
+            'content_blocks': content_blocks,
+            'prev_article': navigation.get('prev_article'),
+            'next_article': navigation.get('next_article'),
+        }
+
+
+# Full-text index for /api/news/search (created by create_indexes.py and news_crawler.py)
+news_search_index = FullTextIndex(
+    'news_article', ['title', 'content_text'],
+    name='ft_news_article_search',
+    weights=[10.0, 1.0]
+)
 
 
 # === Schedule Models === #
@@ -132,8 +232,13 @@ class Teacher(db.Model):
 class Schedule(db.Model):
     """Schedule entry model"""
     __tablename__ = 'schedule'
-    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci',
-                      'mysql_engine': 'InnoDB'}
+    __table_args__ = (
+        # Range and keyset queries of /api/schedule for a group
+        db.Index('idx_schedule_group_date_time', 'group_name', 'date', 'time_start'),
+        # Partition lookups of the diff schedule sync (schedule_sync.py)
+        db.Index('idx_schedule_semester_group', 'semester', 'group_name'),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci', 'mysql_engine': 'InnoDB'},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     semester = db.Column(db.Integer, nullable=False, index=True)
@@ -437,4 +542,68 @@ class BulkNotification(db.Model):
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
 
-    admin = db.relationship('User', foreign_keys=[admin_id])
\ No newline at end of file
+    admin = db.relationship('User', foreign_keys=[admin_id])
+
+# === Group Catalog Model === #
+
+class GroupInfo(db.Model):
+    """One row per schedule group, rebuilt from the schedule table after every sync"""
+    __tablename__ = 'group_info'
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    id = db.Column(db.Integer, primary_key=True)
+    group_name = db.Column(db.String(20, collation='utf8mb4_unicode_ci'), nullable=False, unique=True, index=True)
+    course = db.Column(db.Integer, nullable=True, index=True)
+    faculty = db.Column(db.String(100, collation='utf8mb4_unicode_ci'))
+    semester = db.Column(db.Integer, nullable=True)
+    subgroups = db.Column(db.String(100), default='')  # comma-separated subgroup numbers, e.g. "1,2"
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GroupInfo {self.group_name} course:{self.course}>'
+
+    def to_dict(self):
+        """Converts the group to a dictionary (also used for the in-memory catalog)"""
+        return {
+            'group_name': self.group_name,
+            'course': self.course,
+            'faculty': self.faculty,
+            'semester': self.semester,
+            'subgroups': [int(subgroup) for subgroup in self.subgroups.split(',') if subgroup] if self.subgroups else []
+        }
+
+
+# === Schedule Snapshot Model === #
+
+class ScheduleSnapshot(db.Model):
+    """Serialized week of lessons of one group or schedule teacher, rebuilt after every sync"""
+    __tablename__ = 'schedule_snapshot'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'owner', 'week_start', name='uq_schedule_snapshot_week'),
+        {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)  # 'group' or 'teacher'
+    owner = db.Column(db.String(100, collation='utf8mb4_unicode_ci'), nullable=False)  # group or teacher name
+    week_start = db.Column(db.Date, nullable=False)  # Monday
+    body = db.Column(db.Text(length=16777215), nullable=False)  # JSON list as served by /api/schedule
+    etag = db.Column(db.String(64), nullable=False)
+    lessons = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScheduleSnapshot {self.kind} {self.owner} {self.week_start}>'
+
+
+# === Cache Invalidation Model === #
+
+class CacheInvalidation(db.Model):
+    """Change announcement read by every process to drop stale in-process cache entries"""
+    __tablename__ = 'cache_invalidation'
+    __table_args__ = {'mysql_charset': 'utf8mb4', 'mysql_collate': 'utf8mb4_unicode_ci'}
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(50), nullable=False)  # e.g. 'user'
+    key = db.Column(db.String(191), nullable=True)  # None = the whole scope
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
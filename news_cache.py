@@ -0,0 +1,229 @@
+"""
+In-process caches for data scraped from the university website (melsu.ru).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class StaleWhileRevalidateCache:
+    """Bounded TTL cache that keeps serving stale entries while they are refreshed in the background.
+
+    An entry younger than ``ttl`` is fresh. Between ``ttl`` and ``ttl + stale_ttl`` it is
+    returned immediately and a single background refresh is started. Older entries are
+    reloaded synchronously. A failed refresh keeps the last good value, which stays
+    available through peek() until it is evicted.
+    """
+
+    def __init__(self, loader, ttl, stale_ttl, max_size, name='cache'):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.name = name
+
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the cached value for key, loading it synchronously on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age <= self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    self._start_refresh(key)
+                    return value
+            self.misses += 1
+
+        value = self.loader(key)
+        self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        """Stores a freshly loaded value, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key):
+        """Returns the last loaded value for key however old it is, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else None
+
+    def invalidate(self, key=None):
+        """Drops one entry, or the whole cache when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'evictions': self.evictions,
+            }
+
+    def _start_refresh(self, key):
+        # Caller holds self._lock
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        thread = threading.Thread(target=self._refresh, args=(key,), name=f"{self.name}-refresh", daemon=True)
+        thread.start()
+
+    def _refresh(self, key):
+        try:
+            value = self.loader(key)
+            self.set(key, value)
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"[{self.name}] Background refresh failed for {key!r}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class ContentBlocksCache:
+    """LRU memo of parsed article content blocks keyed by a hash of the article HTML.
+
+    When disk_dir is set, parsed blocks are also written there as JSON files, so they
+    survive restarts and are shared between worker processes. Cached block lists are
+    shared between callers and must not be mutated.
+    """
+
+    def __init__(self, parser, max_size, disk_dir=None, version='1', name='content-blocks'):
+        self.parser = parser
+        self.max_size = max_size
+        self.disk_dir = disk_dir
+        self.version = version
+        self.name = name
+
+        self._entries = OrderedDict()  # key -> blocks
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def key_for(self, content_html):
+        """Returns the cache key for article HTML (includes the parser version)."""
+        return hashlib.sha256(f"{self.version}\x1f{content_html}".encode('utf-8')).hexdigest()
+
+    def get(self, content_html):
+        """Returns content blocks for the HTML, parsing it only on a miss."""
+        if not content_html:
+            return []
+        key = self.key_for(content_html)
+        with self._lock:
+            blocks = self._entries.get(key)
+            if blocks is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return blocks
+
+        blocks = self._read_disk(key)
+        if blocks is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            blocks = self.parser(content_html)
+            with self._lock:
+                self.misses += 1
+            self._write_disk(key, blocks)
+
+        with self._lock:
+            self._entries[key] = blocks
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return blocks
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'disk': bool(self.disk_dir),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+            }
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[{self.name}] Error reading cached blocks {key}: {str(e)}")
+            return None
+
+    def _write_disk(self, key, blocks):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(blocks, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[{self.name}] Error writing cached blocks {key}: {str(e)}")
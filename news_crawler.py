@@ -0,0 +1,197 @@
+"""
+Incremental crawler that mirrors news from melsu.ru into the news_article table.
+
+Usage:
+    python news_crawler.py              # fetch new and changed articles
+    python news_crawler.py --full       # walk all listing pages and refetch every article
+    python news_crawler.py --max-pages 5
+
+Meant to be run periodically (e.g. from cron) next to the API process.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import time
+
+import requests
+
+from db import db
+from models import NewsArticle, news_search_index
+from news_cache import ContentBlocksCache
+from news_parser import parse_news_listing, parse_news_detail, parse_news_detail_for_mobile, CONTENT_BLOCKS_VERSION
+from upstream import upstream_get
+
+
+class NewsFetchError(Exception):
+    """Raised when a page cannot be fetched from the university website."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fetch_news_page(page):
+    """Downloads and parses one news listing page from melsu.ru."""
+    url = f"https://melsu.ru/news?page={page}"
+    response = upstream_get(url, timeout=15)
+    if response.status_code != 200:
+        raise NewsFetchError(f"melsu.ru returned {response.status_code} for {url}", response.status_code)
+    return parse_news_listing(response.text)
+
+
+def fetch_news_detail(news_id):
+    """Downloads and parses one news article page from melsu.ru."""
+    url = f"https://melsu.ru/news/show/{news_id}"
+    response = upstream_get(url, timeout=15)
+    if response.status_code != 200:
+        raise NewsFetchError(f"melsu.ru returned {response.status_code} for {url}", response.status_code)
+    return parse_news_detail(response.text, news_id)
+
+
+def listing_hash(item):
+    """Hash of the listing fields, used to notice edited articles without fetching them."""
+    fields = [item.get(key) or '' for key in ('title', 'date', 'category', 'description', '_debug_original_src')]
+    return hashlib.sha256('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+
+def content_hash(content_html):
+    """Hash of the article body HTML."""
+    return hashlib.sha256((content_html or '').encode('utf-8')).hexdigest()
+
+
+def apply_listing_item(article, listing_item):
+    """Copies the listing fields (description, url, thumbnail) of a listing item to the article."""
+    article.description = listing_item.get('description')
+    article.url = listing_item.get('url')
+    article.image_src = listing_item.get('_debug_original_src')
+    article.listing_hash = listing_hash(listing_item)
+
+
+def store_news_detail(detail, article=None, listing_item=None, blocks_parser=parse_news_detail_for_mobile):
+    """Creates or updates a NewsArticle from parsed detail (and optionally listing) data.
+
+    Content blocks are only rebuilt when the article body has changed. Blocks already
+    built by parse_news_detail are used as is; blocks_parser is the fallback.
+    The caller is responsible for committing the session.
+    """
+    news_id = int(detail['id'])
+    if article is None:
+        article = db.session.get(NewsArticle, news_id)
+    if article is None:
+        article = NewsArticle(id=news_id)
+        db.session.add(article)
+
+    article.title = detail.get('title') or article.title
+    article.date = detail.get('date') or article.date
+    article.category = detail.get('category') or article.category
+    article.header_image_src = detail.get('header_image_src')
+    article.navigation = json.dumps({
+        'prev_article': detail.get('prev_article'),
+        'next_article': detail.get('next_article'),
+    }, ensure_ascii=False)
+
+    new_content_hash = content_hash(detail.get('content_html'))
+    if article.content_hash != new_content_hash:
+        article.content_html = detail.get('content_html')
+        article.content_text = detail.get('content_text')
+        content_blocks = detail.get('content_blocks')
+        if content_blocks is None:
+            content_blocks = blocks_parser(detail.get('content_html'))
+        article.content_blocks = json.dumps(content_blocks, ensure_ascii=False)
+        article.content_hash = new_content_hash
+
+    if listing_item is not None:
+        apply_listing_item(article, listing_item)
+
+    article.fetched_at = datetime.datetime.utcnow()
+    return article
+
+
+def crawl_news(max_pages=None, full=False, delay=0.5, blocks_parser=parse_news_detail_for_mobile):
+    """Walks listing pages from the newest one and stores new or changed articles.
+
+    Stops at the first listing page on which every article is already stored and
+    unchanged (unless full=True), or when the site starts repeating pages.
+    Must be called inside an application context. Returns a dict with counters.
+    """
+    stats = {'pages': 0, 'new': 0, 'updated': 0, 'unchanged': 0, 'errors': 0}
+    seen_ids = set()
+    page = 1
+
+    while max_pages is None or page <= max_pages:
+        try:
+            items = fetch_news_page(page)
+        except (NewsFetchError, requests.RequestException) as e:
+            print(f"Error fetching news page {page}: {str(e)}")
+            stats['errors'] += 1
+            break
+
+        # The site returns the last page again for out-of-range page numbers
+        items = [item for item in items if int(item['id']) not in seen_ids]
+        if not items:
+            break
+        stats['pages'] += 1
+
+        ids = [int(item['id']) for item in items]
+        seen_ids.update(ids)
+        existing = {article.id: article for article in NewsArticle.query.filter(NewsArticle.id.in_(ids)).all()}
+
+        unchanged_on_page = 0
+        for item in items:
+            article = existing.get(int(item['id']))
+            if article is not None and not full and article.listing_hash == listing_hash(item):
+                unchanged_on_page += 1
+                continue
+
+            try:
+                detail = fetch_news_detail(item['id'])
+            except (NewsFetchError, requests.RequestException) as e:
+                print(f"Error fetching news article {item['id']}: {str(e)}")
+                stats['errors'] += 1
+                continue
+
+            store_news_detail(detail, article=article, listing_item=item, blocks_parser=blocks_parser)
+            stats['new' if article is None else 'updated'] += 1
+            if delay:
+                time.sleep(delay)
+
+        db.session.commit()
+        stats['unchanged'] += unchanged_on_page
+        print(f"News page {page}: {len(items)} articles, {unchanged_on_page} unchanged")
+
+        if unchanged_on_page == len(items) and not full:
+            break
+        page += 1
+
+    return stats
+
+
+if __name__ == '__main__':
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description='Mirror news from melsu.ru into the database')
+    parser.add_argument('--max-pages', type=int, default=None, help='Maximum number of listing pages to walk')
+    parser.add_argument('--full', action='store_true', help='Refetch every article instead of stopping at known ones')
+    parser.add_argument('--delay', type=float, default=0.5, help='Pause between article requests, seconds')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object('config')
+    db.init_app(app)
+
+    # Shares the on-disk content blocks memo with the API when CONTENT_BLOCKS_CACHE_DIR is set
+    content_blocks_cache = ContentBlocksCache(
+        parser=parse_news_detail_for_mobile,
+        max_size=app.config['CONTENT_BLOCKS_CACHE_SIZE'],
+        disk_dir=app.config['CONTENT_BLOCKS_CACHE_DIR'],
+        version=CONTENT_BLOCKS_VERSION,
+    )
+
+    with app.app_context():
+        NewsArticle.__table__.create(db.engine, checkfirst=True)
+        with db.engine.begin() as connection:
+            news_search_index.create(connection)
+        result = crawl_news(max_pages=args.max_pages, full=args.full, delay=args.delay,
+                            blocks_parser=content_blocks_cache.get)
+        print(f"News crawl complete: {result}")
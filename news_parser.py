@@ -0,0 +1,374 @@
+"""
+Parsing of news pages from the university website (melsu.ru).
+
+Everything here works on raw HTML and returns plain dicts/lists, so it can be
+used both by the API and by the standalone news crawler.
+
+Each page is parsed into a single lxml tree. Listing fields, detail fields, the
+article text and its content blocks are all read from that tree with XPath
+expressions and regexes compiled once at import time.
+"""
+import html
+import re
+
+import lxml.html
+from lxml import etree
+
+# Bump when the output of parse_news_detail_for_mobile changes, so memoized blocks are rebuilt
+CONTENT_BLOCKS_VERSION = '3'
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+_INVISIBLE_RE = re.compile(r'[\u200B-\u200D\uFEFF]')
+_IMAGE_MARKER_RE = re.compile(r'<span class="image-marker"[^>]*>.*?</span>')
+_BOLD_RE = re.compile(r'<(strong|b)>(.*?)</(strong|b)>', re.DOTALL)
+_ITALIC_RE = re.compile(r'<(em|i)>(.*?)</(em|i)>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+_NEWS_ID_RE = re.compile(r'/news/show/(\d+)')
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_NEWS_BOXES = etree.XPath(f"//*[{_has_class('news-box')} or {_has_class('first-news-box')}]")
+_FIRST_LINK = etree.XPath("descendant::a[1]")
+_FIRST_IMG = etree.XPath("descendant::img[1]")
+_FIRST_SPAN = etree.XPath("descendant::span[1]")
+_FIRST_CATEGORY = etree.XPath(f"descendant::*[{_has_class('meta-category')}][1]")
+_FIRST_DATE_ICON = etree.XPath(f"descendant::*[{_has_class('bi-calendar2-week')}][1]")
+_TITLE_CANDIDATES = [
+    etree.XPath("descendant::h2[1]"),
+    etree.XPath("descendant::h3[1]"),
+    etree.XPath(f"descendant::*[{_has_class('title')}][1]"),
+]
+_DESCRIPTION_CANDIDATES = {
+    'first': [
+        etree.XPath(f"descendant::*[{_has_class('line-clamp-10')}]//p"),
+        etree.XPath(f"descendant::*[{_has_class('line-clamp-10')}]"),
+        etree.XPath("descendant::p"),
+    ],
+    'regular': [
+        etree.XPath(f"descendant::*[{_has_class('description-news')}]//p"),
+        etree.XPath(f"descendant::*[{_has_class('description-news')}]"),
+        etree.XPath(f"descendant::*[{_has_class('line-clamp-3')}]"),
+        etree.XPath("descendant::p"),
+    ],
+}
+
+_DETAIL_TITLE = etree.XPath(f"(//h1[{_has_class('text-4xl')}])[1]")
+_ANY_H1 = etree.XPath("(//h1)[1]")
+_CONTENT_DIV = etree.XPath(f"(//*[{_has_class('content-news')}])[1]")
+_HEADER_IMG = etree.XPath(f"(//*[{_has_class('img-news-box')}]//img)[1]")
+_HEADER_IMG_FALLBACK = etree.XPath(f"(//*[{_has_class('header-image')}]//img)[1]")
+_NAVIGATION_LINKS = etree.XPath("//a[starts-with(@href, '/news/show/')]")
+
+_BLOCK_TAGS = ('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table')
+_INLINE_MARKERS = {'strong': '**', 'b': '**', 'em': '_', 'i': '_'}
+
+
+def clean_text(text):
+    """Cleans text from invisible characters and excess whitespace."""
+    if not text:
+        return ""
+    text = _INVISIBLE_RE.sub('', text)
+    text = html.unescape(text)
+    text = text.replace('\u200b', '')
+    return text.strip()
+
+
+def process_text_with_formatting(html_text):
+    """Processes HTML text, preserving basic formatting (bold, italic)."""
+    if not html_text:
+        return ""
+    if not isinstance(html_text, str):
+        html_text = str(html_text)
+    html_text = _IMAGE_MARKER_RE.sub('', html_text)
+    html_text = _BOLD_RE.sub(r'**\2**', html_text)
+    html_text = _ITALIC_RE.sub(r'_\2_', html_text)
+    html_text = _TAG_RE.sub('', html_text)
+    html_text = html.unescape(html_text)
+    html_text = _WHITESPACE_RE.sub(' ', html_text).strip()
+    return html_text
+
+
+def _parse_document(page_html):
+    """Parses a whole page into an lxml tree (None for an empty page)."""
+    if not page_html or not page_html.strip():
+        return None
+    return lxml.html.document_fromstring(page_html.encode('utf-8'), parser=_HTML_PARSER)
+
+
+def _parse_fragment(html_content):
+    """Parses an HTML fragment into an lxml tree wrapped in a <div>."""
+    return lxml.html.fragment_fromstring(html_content.encode('utf-8'), create_parent='div', parser=_HTML_PARSER)
+
+
+def _first(xpath, element):
+    found = xpath(element)
+    return found[0] if found else None
+
+
+def _text(element):
+    return element.text_content() if element is not None else ''
+
+
+def _formatted_text(element):
+    """Text of an element with <strong>/<b> as **bold** and <em>/<i> as _italic_."""
+    parts = []
+    _collect_formatted_text(element, parts, ())
+    return _WHITESPACE_RE.sub(' ', ''.join(parts)).strip()
+
+
+def _collect_formatted_text(element, parts, open_markers):
+    if element.text:
+        parts.append(element.text)
+    for child in element:
+        if isinstance(child.tag, str):
+            marker = None if child.attrib else _INLINE_MARKERS.get(child.tag)
+            # Nested bold or italic is collapsed: <strong><b>x</b></strong> is **x**, as in the old parser
+            if marker in open_markers:
+                marker = None
+            if marker:
+                parts.append(marker)
+            _collect_formatted_text(child, parts, open_markers + (marker,) if marker else open_markers)
+            if marker:
+                parts.append(marker)
+        if child.tail:
+            parts.append(child.tail)
+
+
+def _merge_text_blocks(content_blocks):
+    merged_blocks = []
+    current_text = ""
+
+    for block in content_blocks:
+        if block["type"] == "text":
+            if current_text:
+                current_text += "\n\n" + block["content"]
+            else:
+                current_text = block["content"]
+        else:
+            if current_text:
+                merged_blocks.append({
+                    "type": "text",
+                    "content": current_text
+                })
+                current_text = ""
+            merged_blocks.append(block)
+
+    if current_text:
+        merged_blocks.append({
+            "type": "text",
+            "content": current_text
+        })
+
+    return merged_blocks
+
+
+def build_content_blocks(content_root):
+    """Builds structured blocks for mobile display from an already parsed content element."""
+    content_blocks = []
+    images = [img for img in content_root.iter('img') if img.get('src')]
+    processed = set()
+
+    def take_images(element):
+        for img in element.iter('img'):
+            if img.get('src') and id(img) not in processed:
+                content_blocks.append({
+                    "type": "image",
+                    "src": img.get('src')
+                })
+                processed.add(id(img))
+
+    for element in content_root.iter(*_BLOCK_TAGS):
+        tag_name = element.tag
+        if tag_name == 'p':
+            formatted_text = _formatted_text(element)
+            if formatted_text:
+                content_blocks.append({
+                    "type": "text",
+                    "content": formatted_text
+                })
+            take_images(element)
+
+        elif tag_name.startswith('h'):
+            content_blocks.append({
+                "type": "header",
+                "level": int(tag_name[1]),
+                "content": process_text_with_formatting(element.text_content())
+            })
+
+        elif tag_name == 'ul' or tag_name == 'ol':
+            content_blocks.append({
+                "type": "list",
+                "list_type": "ordered" if tag_name == 'ol' else "unordered",
+                "items": [process_text_with_formatting(li.text_content()) for li in element.iterchildren('li')]
+            })
+
+        elif tag_name == 'table':
+            take_images(element)
+            table_text = element.text_content().strip()
+            if table_text:
+                content_blocks.append({
+                    "type": "text",
+                    "content": "Таблица: " + table_text
+                })
+
+    for img in images:
+        if id(img) not in processed:
+            content_blocks.append({
+                "type": "image",
+                "src": img.get('src')
+            })
+            processed.add(id(img))
+
+    return _merge_text_blocks(content_blocks)
+
+
+def parse_news_detail_for_mobile(html_content):
+    """Parses news HTML content into structured blocks for mobile display."""
+    if not html_content or not html_content.strip():
+        return []
+    try:
+        return build_content_blocks(_parse_fragment(html_content))
+    except Exception as e:
+        print(f"Error parsing HTML content: {str(e)}")
+        return [{
+            "type": "text",
+            "content": _TAG_RE.sub('', html_content)
+        }]
+
+
+def parse_news_listing(page_html):
+    """Parses a news listing page (/news?page=N) into a list of news item dicts."""
+    tree = _parse_document(page_html)
+    if tree is None:
+        return []
+    news_items = []
+
+    for news_box in _NEWS_BOXES(tree):
+        try:
+            link = _first(_FIRST_LINK, news_box)
+            if link is None:
+                continue
+            href = link.get('href')
+            if not href:
+                continue
+
+            match = _NEWS_ID_RE.search(href)
+            if not match:
+                continue
+            news_id = match.group(1)
+
+            # ── картинка ──────────────────────────────────────────────
+            image_tag = _first(_FIRST_IMG, news_box)
+            original_src = image_tag.get('src') if image_tag is not None and image_tag.get('src') else None
+
+            # ── остальные поля ───────────────────────────────────────
+            category_tag = _first(_FIRST_CATEGORY, news_box)
+            category = clean_text(_text(category_tag).strip()) if category_tag is not None else None
+
+            date_tag = _first(_FIRST_DATE_ICON, news_box)
+            date_parent = date_tag.getparent() if date_tag is not None else None
+            date = clean_text(_text(date_parent).strip()) if date_parent is not None else None
+
+            title_container = next(
+                (found[0] for found in (candidates(news_box) for candidates in _TITLE_CANDIDATES) if found), None
+            )
+            title = clean_text(_text(title_container).strip()) if title_container is not None else None
+
+            description = None
+            is_first = 'first-news-box' in (news_box.get('class') or '').split()
+            for candidates in _DESCRIPTION_CANDIDATES['first' if is_first else 'regular']:
+                for elem in candidates(news_box):
+                    text = elem.text_content().strip()
+                    if text and text != title:
+                        description = clean_text(text)
+                        break
+                if description:
+                    break
+
+            news_url = href if href.startswith('https') else f"https://melsu.ru/{href.lstrip('/')}"
+
+            news_items.append(
+                {
+                    "id": news_id,
+                    "title": title,
+                    "category": category,
+                    "date": date,
+                    "description": description,
+                    "url": news_url,
+                    "_debug_original_src": original_src,
+                }
+            )
+        except Exception as item_error:
+            print(f"Error processing news item: {str(item_error)}")
+            continue
+
+    return news_items
+
+
+def parse_news_detail(page_html, news_id):
+    """Parses a news article page (/news/show/<id>), including its content blocks.
+
+    Image sources are returned as found on melsu.ru.
+    """
+    result = {
+        "id": str(news_id),
+        "title": None,
+        "date": None,
+        "category": None,
+        "content_html": None,
+        "content_text": None,
+        "content_blocks": None,
+        "header_image_src": None,
+        "prev_article": None,
+        "next_article": None,
+    }
+    tree = _parse_document(page_html)
+    if tree is None:
+        return result
+
+    title_tag = _first(_DETAIL_TITLE, tree)
+    if title_tag is None:
+        title_tag = _first(_ANY_H1, tree)
+    result["title"] = clean_text(_text(title_tag).strip()) if title_tag is not None else None
+
+    date_tag = _first(_FIRST_DATE_ICON, tree)
+    date_parent = date_tag.getparent() if date_tag is not None else None
+    result["date"] = clean_text(_text(date_parent).strip()) if date_parent is not None else None
+
+    category_tag = _first(_FIRST_CATEGORY, tree)
+    result["category"] = clean_text(_text(category_tag).strip()) if category_tag is not None else None
+
+    # ── контент и заголовочная картинка ────────────────────────────
+    content_div = _first(_CONTENT_DIV, tree)
+    if content_div is not None:
+        result["content_html"] = lxml.html.tostring(content_div, encoding='unicode', with_tail=False)
+        result["content_text"] = content_div.text_content().strip()
+        result["content_blocks"] = build_content_blocks(content_div)
+
+        header_img = _first(_HEADER_IMG, tree)
+        if header_img is None:
+            header_img = _first(_HEADER_IMG_FALLBACK, tree)
+        if header_img is not None and header_img.get("src"):
+            result["header_image_src"] = header_img.get("src")
+
+    # ── навигация «пред./след.» ─────────────────────────────────────
+    for link in _NAVIGATION_LINKS(tree):
+        link_text = link.text_content().strip().lower()
+        match = _NEWS_ID_RE.search(link.get("href", ""))
+        if not match:
+            continue
+        link_id = match.group(1)
+
+        if any(x in link_text for x in ("предыдущ", "пред", "←")):
+            title_span = _first(_FIRST_SPAN, link)
+            result["prev_article"] = {"id": link_id, "title": (clean_text(_text(title_span)) if title_span is not None else "Предыдущая новость")}
+        elif any(x in link_text for x in ("следующ", "след", "→")):
+            title_span = _first(_FIRST_SPAN, link)
+            result["next_article"] = {"id": link_id, "title": (clean_text(_text(title_span)) if title_span is not None else "Следующая новость")}
+
+    return result
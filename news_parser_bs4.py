@@ -0,0 +1,296 @@
+"""
+Reference BeautifulSoup (html.parser) implementation of the melsu.ru news parsers.
+
+This is the parsing path the API used before news_parser switched to lxml. It is
+kept only so that bench_news_parser.py can compare speed and output against it.
+"""
+import html
+import re
+
+from bs4 import BeautifulSoup
+
+
+def clean_text(text):
+    """Cleans text from invisible characters and excess whitespace."""
+    if not text:
+        return ""
+    text = re.sub(r'[\u200B-\u200D\uFEFF]', '', text)
+    text = html.unescape(text)
+    text = text.replace('\u200b', '')
+    return text.strip()
+
+
+def process_text_with_formatting(html_text):
+    """Processes HTML text, preserving basic formatting (bold, italic)."""
+    if not html_text:
+        return ""
+    if not isinstance(html_text, str):
+        html_text = str(html_text)
+    html_text = re.sub(r'<span class="image-marker"[^>]*>.*?</span>', '', html_text)
+    html_text = re.sub(r'<(strong|b)>(.*?)</(strong|b)>', r'**\2**', html_text, flags=re.DOTALL)
+    html_text = re.sub(r'<(em|i)>(.*?)</(em|i)>', r'_\2_', html_text, flags=re.DOTALL)
+    html_text = re.sub(r'<[^>]+>', '', html_text)
+    html_text = html.unescape(html_text)
+    html_text = re.sub(r'\s+', ' ', html_text).strip()
+    return html_text
+
+
+def parse_news_detail_for_mobile(html_content):
+    """Parses news HTML content into structured blocks for mobile display."""
+    if not html_content:
+        return []
+    try:
+        soup = BeautifulSoup(html_content, 'html.parser')
+        content_blocks = []
+        all_images = soup.find_all('img')
+        image_positions = {}
+
+        for img in all_images:
+            if img.get('src'):
+                img_id = f"img_{len(image_positions)}"
+                image_positions[img_id] = {
+                    'src': img.get('src'),
+                    'processed': False
+                }
+                marker = soup.new_tag('span')
+                marker['class'] = 'image-marker'
+                marker['data-image-id'] = img_id
+                img.replace_with(marker)
+
+        for element in soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table']):
+            tag_name = element.name
+            if tag_name == 'p':
+                element_text = str(element)
+                markers = element.find_all('span', class_='image-marker')
+                if markers:
+                    text_before = process_text_with_formatting(str(element))
+                    if text_before.strip():
+                        content_blocks.append({
+                            "type": "text",
+                            "content": text_before
+                        })
+                    for marker in markers:
+                        img_id = marker.get('data-image-id')
+                        if img_id and img_id in image_positions and not image_positions[img_id]['processed']:
+                            content_blocks.append({
+                                "type": "image",
+                                "src": image_positions[img_id]['src']
+                            })
+                            image_positions[img_id]['processed'] = True
+                else:
+                    formatted_text = process_text_with_formatting(str(element))
+                    if formatted_text.strip():
+                        content_blocks.append({
+                            "type": "text",
+                            "content": formatted_text
+                        })
+
+            elif tag_name.startswith('h'):
+                level = int(tag_name[1])
+                content_blocks.append({
+                    "type": "header",
+                    "level": level,
+                    "content": process_text_with_formatting(element.get_text())
+                })
+
+            elif tag_name == 'ul' or tag_name == 'ol':
+                list_items = []
+                for li in element.find_all('li', recursive=False):
+                    list_items.append(process_text_with_formatting(li.get_text()))
+
+                content_blocks.append({
+                    "type": "list",
+                    "list_type": "ordered" if tag_name == 'ol' else "unordered",
+                    "items": list_items
+                })
+
+            elif tag_name == 'table':
+                table_images = element.find_all('span', class_='image-marker')
+                for marker in table_images:
+                    img_id = marker.get('data-image-id')
+                    if img_id and img_id in image_positions and not image_positions[img_id]['processed']:
+                        content_blocks.append({
+                            "type": "image",
+                            "src": image_positions[img_id]['src']
+                        })
+                        image_positions[img_id]['processed'] = True
+                table_text = element.get_text().strip()
+                if table_text:
+                    content_blocks.append({
+                        "type": "text",
+                        "content": "Таблица: " + table_text
+                    })
+
+        for img_id, img_info in image_positions.items():
+            if not img_info['processed']:
+                content_blocks.append({
+                    "type": "image",
+                    "src": img_info['src']
+                })
+                img_info['processed'] = True
+
+        merged_blocks = []
+        current_text = ""
+
+        for block in content_blocks:
+            if block["type"] == "text":
+                if current_text:
+                    current_text += "\n\n" + block["content"]
+                else:
+                    current_text = block["content"]
+            else:
+                if current_text:
+                    merged_blocks.append({
+                        "type": "text",
+                        "content": current_text
+                    })
+                    current_text = ""
+                merged_blocks.append(block)
+
+        if current_text:
+            merged_blocks.append({
+                "type": "text",
+                "content": current_text
+            })
+
+        return merged_blocks
+
+    except Exception as e:
+        print(f"Error parsing HTML content: {str(e)}")
+        return [{
+            "type": "text",
+            "content": BeautifulSoup(html_content, 'html.parser').get_text()
+        }]
+
+
+def parse_news_listing(page_html):
+    """Parses a news listing page (/news?page=N) into a list of news item dicts."""
+    soup = BeautifulSoup(page_html, 'html.parser')
+    news_items = []
+    news_boxes = soup.select('.news-box, .first-news-box')
+
+    for news_box in news_boxes:
+        try:
+            link = news_box.select_one('a')
+            if not link:
+                continue
+            href = link.get('href')
+            if not href:
+                continue
+
+            match = re.search(r'/news/show/(\d+)', href)
+            if not match:
+                continue
+            news_id = match.group(1)
+
+            # ── картинка ──────────────────────────────────────────────
+            image_tag = news_box.select_one('img')
+            original_src = image_tag['src'] if image_tag and image_tag.get('src') else None
+
+            # ── остальные поля ───────────────────────────────────────
+            category_tag = news_box.select_one('.meta-category')
+            category = clean_text(category_tag.text.strip()) if category_tag else None
+
+            date_tag = news_box.select_one('.bi-calendar2-week')
+            date = clean_text(date_tag.parent.text.strip()) if date_tag and date_tag.parent else None
+
+            title_container = (
+                news_box.select_one('h2')
+                or news_box.select_one('h3')
+                or news_box.select_one('.title')
+            )
+            title = clean_text(title_container.text.strip()) if title_container else None
+
+            description = None
+            description_selectors = (
+                ['.line-clamp-10 p', '.line-clamp-10', 'p']
+                if "first-news-box" in news_box.get('class', [])
+                else ['.description-news p', '.description-news', '.line-clamp-3', 'p']
+            )
+            for selector in description_selectors:
+                for elem in news_box.select(selector):
+                    text = elem.text.strip()
+                    if text and text != title:
+                        description = clean_text(text)
+                        break
+                if description:
+                    break
+
+            news_url = href if href.startswith('https') else f"https://melsu.ru/{href.lstrip('/')}"
+
+            news_items.append(
+                {
+                    "id": news_id,
+                    "title": title,
+                    "category": category,
+                    "date": date,
+                    "description": description,
+                    "url": news_url,
+                    "_debug_original_src": original_src,
+                }
+            )
+        except Exception as item_error:
+            print(f"Error processing news item: {str(item_error)}")
+            continue
+
+    return news_items
+
+
+def parse_news_detail(page_html, news_id):
+    """Parses a news article page (/news/show/<id>).
+
+    Image sources are returned as found on melsu.ru; content_blocks are not built here.
+    """
+    soup = BeautifulSoup(page_html, "html.parser")
+
+    title_tag = soup.select_one("h1.text-4xl") or soup.select_one("h1")
+    title = clean_text(title_tag.text.strip()) if title_tag else None
+
+    date_tag = soup.select_one(".bi-calendar2-week")
+    date = clean_text(date_tag.parent.text.strip()) if date_tag and date_tag.parent else None
+
+    category_tag = soup.select_one(".meta-category")
+    category = clean_text(category_tag.text.strip()) if category_tag else None
+
+    result = {
+        "id": str(news_id),
+        "title": title,
+        "date": date,
+        "category": category,
+        "content_html": None,
+        "content_text": None,
+        "header_image_src": None,
+    }
+
+    # ── контент и заголовочная картинка ────────────────────────────
+    content_div = soup.select_one(".content-news")
+    if content_div:
+        result["content_html"] = str(content_div)
+        result["content_text"] = BeautifulSoup(str(content_div), "html.parser").get_text().strip()
+
+        header_img = soup.select_one(".img-news-box img") or soup.select_one(".header-image img")
+        if header_img and header_img.get("src"):
+            result["header_image_src"] = header_img["src"]
+
+    # ── навигация «пред./след.» ─────────────────────────────────────
+    prev_article, next_article = None, None
+    navigation_links = soup.select('a[href^="/news/show/"]')
+    for link in navigation_links:
+        link_text = link.text.strip().lower()
+        href = link.get("href", "")
+        match = re.search(r"/news/show/(\d+)", href)
+        if not match:
+            continue
+        link_id = match.group(1)
+
+        if any(x in link_text for x in ("предыдущ", "пред", "←")):
+            title_span = link.select_one("span")
+            prev_article = {"id": link_id, "title": (clean_text(title_span.text) if title_span else "Предыдущая новость")}
+        elif any(x in link_text for x in ("следующ", "след", "→")):
+            title_span = link.select_one("span")
+            next_article = {"id": link_id, "title": (clean_text(title_span.text) if title_span else "Следующая новость")}
+
+    result["prev_article"] = prev_article
+    result["next_article"] = next_article
+
+    return result
@@ -0,0 +1,167 @@
+"""
+Profile payloads for /api/user/profile.
+
+The user row and the linked HR teacher record are read with one joined query,
+the course comes from the group catalog. Built payloads are cached per user
+and dropped when the user changes ('user' scope: profile edits, verification),
+when a teacher record is linked, unlinked or edited ('teachers' scope) and
+when the group catalog is rebuilt ('group_info' scope).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from db import db
+from group_catalog import group_catalog
+from models import Teacher, User
+
+
+def load_profile(user_id):
+    """Returns (profile dict, linked teacher id) for the user, or (None, None) if it does not exist."""
+    row = db.session.query(
+        User.id, User.username, User.full_name, User.email, User.role, User.is_admin,
+        User.group, User.faculty, User.verification_status, User.student_card_image,
+        User.speciality_id, User.speciality_code, User.speciality_name,
+        User.study_form, User.study_form_name,
+        Teacher.id.label('teacher_id'), Teacher.name.label('teacher_name'),
+        Teacher.department.label('teacher_department'), Teacher.position.label('teacher_position')
+    ).outerjoin(Teacher, Teacher.user_id == User.id) \
+        .filter(User.id == user_id) \
+        .order_by(Teacher.id) \
+        .first()
+    if row is None:
+        return None, None
+    role = row.role or ('admin' if row.is_admin else 'unknown')
+    teacher_id = row.teacher_id if role == 'teacher' else None
+    return build_profile(row, role, teacher_id is not None), teacher_id
+
+
+def build_profile(user, role, with_teacher=False):
+    """Builds the profile dict from a joined row (or a user snapshot when with_teacher is False)."""
+    profile = {
+        'id': user.id,
+        'username': user.username,
+        'email': getattr(user, 'email', None),
+        'fullName': user.full_name or (user.teacher_name if with_teacher else ''),
+        'role': user.role,
+        'group': user.group,
+        'faculty': user.faculty,
+        'department': user.teacher_department if with_teacher else None,
+        'position': user.teacher_position if with_teacher else None,
+        'verificationStatus': user.verification_status or 'verified',
+        'studentCardImage': user.student_card_image,
+        'speciality': {
+            'id': user.speciality_id,
+            'code': user.speciality_code,
+            'name': user.speciality_name,
+            'form': user.study_form,
+            'formName': user.study_form_name
+        }
+    }
+    if role == 'student' and user.group:
+        course = group_catalog.course_of(user.group)
+        if course is not None:
+            profile['course'] = course
+    return profile
+
+
+class ProfileCache:
+    """Bounded TTL cache: user id -> (profile, linked teacher id, role).
+
+    Every user has a version stamp that invalidation bumps; a profile loaded
+    while its user was being invalidated is returned but not stored.
+    """
+
+    def __init__(self, ttl, max_size, name='profiles'):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.name = name
+
+        self._entries = OrderedDict()  # user_id -> (profile, teacher_id, role, stored_at)
+        self._versions = {}  # user_id -> version, only for users invalidated since the entry was loaded
+        self._generation = 0  # bumped when everything is invalidated
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_profile(self, user_id):
+        """Returns the user's profile dict (shared, do not modify) or None if the user does not exist."""
+        user_id = int(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[3] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            stamp = (self._generation, self._versions.get(user_id, 0))
+
+        profile, teacher_id = load_profile(user_id)
+        if profile is None:
+            return None
+        with self._lock:
+            if stamp == (self._generation, self._versions.get(user_id, 0)):
+                self._entries[user_id] = (profile, teacher_id, profile['role'], time.monotonic())
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return profile
+
+    def invalidate_user(self, user_id=None):
+        """Drops one user's profile, or all of them when user_id is None."""
+        with self._lock:
+            self.invalidations += 1
+            if user_id is None:
+                self._invalidate_all()
+                return
+            user_id = int(user_id)
+            self._entries.pop(user_id, None)
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def invalidate_teacher(self, teacher_id=None):
+        """Drops profiles that may show the teacher record: its linked user and every unlinked teacher account."""
+        with self._lock:
+            self.invalidations += 1
+            if teacher_id is None:
+                self._invalidate_all()
+                return
+            teacher_id = int(teacher_id)
+            # The record may have just been linked to a user whose cached profile has no teacher yet
+            affected = [
+                user_id for user_id, (_, linked_id, role, _) in self._entries.items()
+                if linked_id == teacher_id or (role == 'teacher' and linked_id is None)
+            ]
+            for user_id in affected:
+                del self._entries[user_id]
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            # A load in flight for the newly linked user is not in _entries yet
+            self._generation += 1
+
+    def invalidate_all(self, key=None):
+        """Drops every profile."""
+        with self._lock:
+            self.invalidations += 1
+            self._invalidate_all()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'profiles': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                'invalidations': self.invalidations,
+            }
+
+    def _invalidate_all(self):
+        # Caller holds self._lock
+        self._entries.clear()
+        self._versions.clear()
+        self._generation += 1
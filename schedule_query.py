@@ -0,0 +1,116 @@
+"""
+Date ranges and keyset pages for /api/schedule.
+
+Lessons are ordered by (date, time_start, id). A page ends with a cursor naming
+its last lesson ("2025-09-01|08:30|1234"); the next page starts strictly after
+it, so pages stay consistent while the client scrolls and no lesson is skipped
+or repeated. With the (group_name, date, time_start) index a group's page is a
+single index range scan.
+"""
+import datetime
+import re
+
+from db import db
+from models import Schedule
+
+_ISO_WEEK_RE = re.compile(r'^(\d{4})-?W(\d{1,2})$', re.IGNORECASE)
+
+
+def parse_date(value):
+    """Parses YYYY-MM-DD; raises ValueError."""
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def week_bounds(value):
+    """Returns (monday, sunday) of the week given as a date in it (YYYY-MM-DD) or an ISO week (2025-W36).
+
+    Raises ValueError for anything else.
+    """
+    match = _ISO_WEEK_RE.match(value.strip())
+    if match:
+        monday = datetime.date.fromisocalendar(int(match.group(1)), int(match.group(2)), 1)
+    else:
+        day = parse_date(value.strip())
+        monday = day - datetime.timedelta(days=day.weekday())
+    return monday, monday + datetime.timedelta(days=6)
+
+
+def parse_schedule_range(args):
+    """Returns the inclusive (start, end) dates requested with week=, from=/to= or date=.
+
+    Either bound may be None. Raises ValueError for malformed or conflicting values;
+    a malformed legacy date= is ignored, as it always was.
+    """
+    week = args.get('week')
+    date_from = args.get('from')
+    date_to = args.get('to')
+    if week:
+        if date_from or date_to:
+            raise ValueError('week cannot be combined with from/to')
+        return week_bounds(week)
+    if date_from or date_to:
+        start = parse_date(date_from) if date_from else None
+        end = parse_date(date_to) if date_to else None
+        if start and end and start > end:
+            raise ValueError('from is after to')
+        return start, end
+    date = args.get('date')
+    if date:
+        try:
+            day = parse_date(date)
+            return day, day
+        except ValueError:
+            pass
+    return None, None
+
+
+def encode_cursor(schedule):
+    """Returns the cursor pointing just after the lesson."""
+    return f"{schedule.date.strftime('%Y-%m-%d')}|{schedule.time_start}|{schedule.id}"
+
+
+def apply_cursor(query, cursor):
+    """Restricts the query to lessons after the cursor; raises ValueError for a malformed one."""
+    parts = cursor.split('|')
+    if len(parts) != 3 or not parts[2].isdigit():
+        raise ValueError('malformed cursor')
+    date, time_start, schedule_id = parse_date(parts[0]), parts[1], int(parts[2])
+    return query.filter(db.or_(
+        Schedule.date > date,
+        db.and_(Schedule.date == date, db.or_(
+            Schedule.time_start > time_start,
+            db.and_(Schedule.time_start == time_start, Schedule.id > schedule_id)
+        ))
+    ))
+
+
+def fetch_schedule_page(query, start, end, cursor, limit):
+    """Returns (lessons, next cursor or None) of the query within [start, end]."""
+    if start:
+        query = query.filter(Schedule.date >= start)
+    if end:
+        query = query.filter(Schedule.date <= end)
+    if cursor:
+        query = apply_cursor(query, cursor)
+    lessons = query.order_by(Schedule.date, Schedule.time_start, Schedule.id).limit(limit + 1).all()
+    if len(lessons) > limit:
+        lessons = lessons[:limit]
+        return lessons, encode_cursor(lessons[-1])
+    return lessons, None
+
+
+def serialize_lesson(schedule):
+    """Serializes a Schedule row for the mobile app."""
+    return {
+        'id': schedule.id,
+        'date': schedule.date.strftime('%Y-%m-%d'),
+        'timeStart': schedule.time_start,
+        'timeEnd': schedule.time_end,
+        'weekday': schedule.weekday,
+        'subject': schedule.subject,
+        'lessonType': schedule.lesson_type,
+        'group': schedule.group_name,
+        'teacher': schedule.teacher_name,
+        'auditory': schedule.auditory,
+        'subgroup': schedule.subgroup
+    }
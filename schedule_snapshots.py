@@ -0,0 +1,137 @@
+"""
+Precomputed weeks of the schedule, one per group and one per schedule teacher.
+
+Schedule data only changes during a sync, so sync_schedule rebuilds the
+snapshots of everything it touched (rebuild_schedule_snapshots). A snapshot
+holds the exact JSON body /api/schedule?week= would return and its ETag, so a
+week request is answered with one indexed lookup and no serialization, and an
+unchanged week costs a bodyless 304.
+
+The table is created by create_indexes.py. Weeks without a snapshot are
+queried as before; all snapshots can be rebuilt with
+
+    python schedule_snapshots.py
+"""
+import datetime
+import hashlib
+
+from flask import current_app
+from sqlalchemy import insert
+
+from db import db
+from models import Schedule, ScheduleSnapshot
+from schedule_query import serialize_lesson
+
+# Owners whose lessons are loaded and serialized at a time (bounds memory on a full rebuild)
+OWNERS_PER_BATCH = 100
+
+_LESSON_COLUMNS = (
+    Schedule.id, Schedule.date, Schedule.time_start, Schedule.time_end, Schedule.weekday,
+    Schedule.subject, Schedule.lesson_type, Schedule.group_name, Schedule.teacher_name,
+    Schedule.auditory, Schedule.subgroup,
+)
+
+
+def week_start(day):
+    """Returns the Monday of the day's week."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def body_etag(body):
+    """ETag of a JSON body; the same value json_response_with_etag in api.py sends."""
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+
+
+def _chunks(values, size=OWNERS_PER_BATCH):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _owner_key(name):
+    # Owners are matched case-insensitively, like the utf8mb4_unicode_ci column
+    return name.strip().lower()
+
+
+def _build_snapshots(kind, column, owners):
+    """Returns snapshot rows of the given owners' weeks."""
+    rows = db.session.query(*_LESSON_COLUMNS) \
+        .filter(column.in_(owners)) \
+        .order_by(Schedule.date, Schedule.time_start, Schedule.id) \
+        .all()
+
+    weeks = {}
+    for row in rows:
+        name = getattr(row, column.key).strip()
+        key = (_owner_key(name), week_start(row.date))
+        if key not in weeks:
+            weeks[key] = (name, [])
+        weeks[key][1].append(serialize_lesson(row))
+    return [_snapshot_row(kind, owner, monday, lessons) for (_, monday), (owner, lessons) in weeks.items()]
+
+
+def _snapshot_row(kind, owner, monday, lessons):
+    body = current_app.json.dumps(lessons)
+    return {
+        'kind': kind,
+        'owner': owner,
+        'week_start': monday,
+        'body': body,
+        'etag': body_etag(body),
+        'lessons': len(lessons),
+    }
+
+
+def _replace_snapshots(kind, column, owners):
+    if owners is None:
+        ScheduleSnapshot.query.filter_by(kind=kind).delete(synchronize_session=False)
+        owners = [owner for (owner,) in db.session.query(column).distinct() if owner and owner.strip()]
+    else:
+        owners = sorted({owner for owner in owners if owner and owner.strip()})
+        for chunk in _chunks(owners):
+            ScheduleSnapshot.query.filter(ScheduleSnapshot.kind == kind, ScheduleSnapshot.owner.in_(chunk)) \
+                .delete(synchronize_session=False)
+
+    count = 0
+    for chunk in _chunks(owners):
+        snapshots = _build_snapshots(kind, column, chunk)
+        if snapshots:
+            db.session.execute(insert(ScheduleSnapshot), snapshots)
+            count += len(snapshots)
+    return count
+
+
+def rebuild_schedule_snapshots(groups=None, teacher_names=None):
+    """Rebuilds the week snapshots of the given groups and teacher names (None = all); the caller commits.
+
+    Pass every owner whose lessons were added, changed or removed, including owners
+    that no longer have lessons, so their stale weeks are deleted. Returns counters.
+    """
+    return {
+        'group_weeks': _replace_snapshots('group', Schedule.group_name, groups),
+        'teacher_weeks': _replace_snapshots('teacher', Schedule.teacher_name, teacher_names),
+    }
+
+
+def get_week_snapshots(kind, owners, monday):
+    """Returns the stored snapshots of the owners' week, one per owner that has lessons in it."""
+    owners = [owner for owner in owners if owner]
+    if not owners:
+        return []
+    return ScheduleSnapshot.query \
+        .filter(ScheduleSnapshot.kind == kind, ScheduleSnapshot.owner.in_(owners),
+                ScheduleSnapshot.week_start == monday) \
+        .all()
+
+
+if __name__ == '__main__':
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config.from_object('config')
+    db.init_app(app)
+
+    with app.app_context():
+        stats = rebuild_schedule_snapshots()
+        db.session.commit()
+        print(f"Schedule snapshots rebuilt: {stats}")
@@ -0,0 +1,176 @@
+"""
+In-memory search index over teacher names for /api/teachers/search.
+
+Names are folded (case, ё -> е, punctuation) and split into trigrams. A query
+is answered by intersecting the posting lists of its trigrams and checking the
+remaining candidates for a substring match, so results are the same as the old
+ILIKE '%name%' query but no table scan is needed. Names of schedule teachers
+matched to an HR teacher are indexed as aliases of that teacher.
+
+The index is loaded at startup and rebuilt lazily after a 'teachers'
+invalidation (teacher sync, matching, account creation) or once it is older
+than TEACHER_INDEX_MAX_AGE seconds, in case an invalidation was missed.
+"""
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+
+from cache_invalidation import invalidation_bus
+from db import db
+from models import Teacher, User, ScheduleTeacher
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_name(text):
+    """Folds case and ё, replaces punctuation with spaces."""
+    text = (text or '').casefold().replace('ё', 'е')
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def trigrams(text):
+    """Returns the set of 3-character substrings of a normalized string."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TeacherSearchIndex:
+    """Trigram index of teacher names with account status, rebuilt from the database on demand."""
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._snapshot = None  # (entries, postings)
+        self._expires_at = 0
+        self._generation = 0  # bumped by invalidate(), so a load racing with it is not kept
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded_at = None
+        self.load_seconds = None
+
+    def search(self, query, limit=None):
+        """Returns teacher dicts whose name contains the query, best matches first (at most limit, if given).
+
+        Ranking: name starts with the query, then a word of the name starts with it,
+        then any other substring (aliases rank after the teacher's own name).
+        """
+        needle = normalize_name(query)
+        if len(needle) < 3:
+            return []
+        entries, postings = self._get_snapshot()
+
+        candidates = None
+        for trigram in sorted(trigrams(needle), key=lambda t: len(postings.get(t, ()))):
+            posting = postings.get(trigram)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return []
+
+        ranked = []
+        for index in candidates:
+            entry = entries[index]
+            best = None
+            for alias_rank, name in enumerate(entry['search_names']):
+                position = name.find(needle)
+                if position < 0:
+                    continue
+                if position == 0:
+                    rank = 0
+                elif name[position - 1] == ' ':
+                    rank = 1
+                else:
+                    rank = 2
+                rank = rank * 2 + min(alias_rank, 1)
+                best = rank if best is None else min(best, rank)
+            if best is not None:
+                ranked.append((best, entry['name'], entry['id'], entry['result']))
+        if limit is None:
+            ranked.sort(key=lambda item: item[:3])
+        else:
+            ranked = heapq.nsmallest(limit, ranked, key=lambda item: item[:3])
+        return [item[3] for item in ranked]
+
+    def load(self):
+        """(Re)builds the index from the database now and returns the new snapshot."""
+        started = time.perf_counter()
+        generation = self._generation
+        rows = db.session.query(
+            Teacher.id, Teacher.name, Teacher.department, Teacher.position,
+            Teacher.user_id, Teacher.has_account, User.id
+        ).outerjoin(User, User.id == Teacher.user_id).all()
+        aliases = defaultdict(list)
+        for teacher_id, alias in db.session.query(ScheduleTeacher.mapped_teacher_id, ScheduleTeacher.name) \
+                .filter(ScheduleTeacher.mapped_teacher_id.isnot(None), ScheduleTeacher.active == True):
+            aliases[teacher_id].append(alias)
+
+        entries = []
+        postings = defaultdict(set)
+        for teacher_id, name, department, position, user_id, has_account, existing_user_id in rows:
+            search_names = [normalize_name(name)]
+            for alias in aliases.get(teacher_id, []):
+                normalized = normalize_name(alias)
+                if normalized not in search_names:
+                    search_names.append(normalized)
+            index = len(entries)
+            entries.append({
+                'id': teacher_id,
+                'name': name or '',
+                'search_names': search_names,
+                'result': {
+                    'id': teacher_id,
+                    'name': name,
+                    'department': department,
+                    'position': position,
+                    'user_id': user_id,
+                    'has_account': bool(has_account) and existing_user_id is not None
+                }
+            })
+            for search_name in search_names:
+                for trigram in trigrams(search_name):
+                    postings[trigram].add(index)
+
+        snapshot = (entries, dict(postings))
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.max_age
+            self.loaded_at = time.time()
+            self.load_seconds = round(time.perf_counter() - started, 4)
+        print(f"Teacher search index loaded: {len(entries)} teachers in {self.load_seconds}s")
+        return snapshot
+
+    def init_app(self, app):
+        """Reads TEACHER_INDEX_MAX_AGE from the app config."""
+        self.max_age = app.config['TEACHER_INDEX_MAX_AGE']
+
+    def invalidate(self, key=None):
+        """Drops the index; the next search rebuilds it."""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def stats(self):
+        """Returns the index size and when it was built."""
+        snapshot = self._snapshot
+        return {
+            'teachers': len(snapshot[0]) if snapshot else 0,
+            'trigrams': len(snapshot[1]) if snapshot else 0,
+            'loaded': snapshot is not None,
+            'loaded_at': self.loaded_at,
+            'load_seconds': self.load_seconds,
+        }
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() >= self._expires_at:
+            with self._load_lock:
+                snapshot = self._snapshot
+                if snapshot is None or time.monotonic() >= self._expires_at:
+                    snapshot = self.load()
+        return snapshot
+
+
+teacher_index = TeacherSearchIndex()
+invalidation_bus.register('teachers', teacher_index.invalidate)
@@ -0,0 +1,140 @@
+"""
+Creates user accounts for every Teacher that does not have one yet.
+
+Usage:
+    python teacher_provisioning.py
+    python teacher_provisioning.py --batch-size 500 --workers 8
+
+The same function backs the "create all accounts" button on the teachers page.
+Passwords are hashed in a process pool (generate_password_hash is deliberately
+slow), usernames are allocated against one preloaded set of existing logins,
+and users, teacher links and welcome notifications are inserted in batches.
+"""
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import insert, update
+from werkzeug.security import generate_password_hash
+
+from cache_invalidation import invalidation_bus
+from db import db
+from models import User, Teacher, Notification
+from username_allocator import first_free_username
+
+WELCOME_TITLE = "Welcome to MelSU Go!"
+WELCOME_BODY = "An account has been created for you in the MelSU Go app. Login: {username}, Password: {password}"
+
+
+def allocate_username_from(name, taken):
+    """Picks a free login for the name and adds it to taken (a set of lowercase logins)."""
+    for base_username in Teacher.username_candidates(name):
+        username = first_free_username(base_username, taken, max_suffix=100)
+        if username:
+            taken.add(username.lower())
+            return username
+
+    while True:
+        username = Teacher.random_login()
+        if username not in taken:
+            taken.add(username)
+            return username
+
+
+def hash_passwords(passwords, workers):
+    """Returns generate_password_hash of every password, computed in worker processes."""
+    if workers <= 1 or len(passwords) < 2:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def provision_teacher_accounts(sender_id=None, batch_size=200, workers=1):
+    """Creates accounts for all teachers without one. Returns counters.
+
+    Each batch (users, teacher links, notifications) is committed on its own, so a
+    failed batch does not undo the ones before it. New accounts have no device
+    tokens yet, so the welcome messages are stored as notifications only.
+    """
+    teachers = db.session.query(Teacher.id, Teacher.name, Teacher.department) \
+        .filter(db.or_(Teacher.has_account == False, Teacher.has_account.is_(None))) \
+        .filter(Teacher.user_id.is_(None)) \
+        .order_by(Teacher.id) \
+        .all()
+    stats = {'teachers': len(teachers), 'created': 0, 'failed': 0, 'batches': 0}
+    if not teachers:
+        return stats
+
+    taken = {username.lower() for (username,) in db.session.query(User.username)}
+    usernames = [allocate_username_from(teacher.name, taken) for teacher in teachers]
+    passwords = [Teacher.generate_password() for _ in teachers]
+    password_hashes = hash_passwords(passwords, workers)
+
+    for start in range(0, len(teachers), batch_size):
+        end = start + batch_size
+        batch = list(zip(teachers[start:end], usernames[start:end], passwords[start:end], password_hashes[start:end]))
+        try:
+            db.session.execute(insert(User), [
+                {
+                    'username': username,
+                    'password': password_hash,
+                    'password_plain': password,
+                    'is_admin': False,
+                    'role': 'teacher',
+                    'full_name': teacher.name,
+                    'verification_status': 'verified',
+                    'faculty': teacher.department or None,
+                }
+                for teacher, username, password, password_hash in batch
+            ])
+            user_ids = dict(
+                db.session.query(User.username, User.id).filter(User.username.in_([item[1] for item in batch]))
+            )
+            db.session.execute(update(Teacher), [
+                {'id': teacher.id, 'has_account': True, 'user_id': user_ids[username]}
+                for teacher, username, _, _ in batch
+            ])
+            db.session.execute(insert(Notification), [
+                {
+                    'user_id': user_ids[username],
+                    'sender_id': sender_id,
+                    'title': WELCOME_TITLE,
+                    'body': WELCOME_BODY.format(username=username, password=password),
+                    'notification_type': 'system',
+                    'data': json.dumps({'username': username, 'is_welcome_message': True}),
+                }
+                for teacher, username, password, _ in batch
+            ])
+            invalidation_bus.publish('teachers')
+            db.session.commit()
+            stats['created'] += len(batch)
+        except Exception as e:
+            db.session.rollback()
+            stats['failed'] += len(batch)
+            print(f"Error creating teacher accounts {start + 1}-{start + len(batch)}: {str(e)}")
+        stats['batches'] += 1
+
+    return stats
+
+
+if __name__ == '__main__':
+    from flask import Flask
+
+    parser = argparse.ArgumentParser(description='Create user accounts for all teachers without one')
+    parser.add_argument('--batch-size', type=int, default=None, help='Accounts per INSERT batch')
+    parser.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+    parser.add_argument('--sender-id', type=int, default=None, help='User id shown as the sender of welcome messages')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object('config')
+    db.init_app(app)
+
+    with app.app_context():
+        result = provision_teacher_accounts(
+            sender_id=args.sender_id,
+            batch_size=args.batch_size or app.config['TEACHER_PROVISION_BATCH_SIZE'],
+            workers=args.workers or app.config['TEACHER_PROVISION_WORKERS'],
+        )
+        print(f"Teacher provisioning complete: {result}")
@@ -0,0 +1,96 @@
+"""
+Fixtures: the API app (api.py) on a temporary SQLite database.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+DB_DIR = tempfile.mkdtemp(prefix='melsu-tests-')
+DATABASE_URL = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+
+# config.py reads DATABASE_URL when api.py imports it
+os.environ['DATABASE_URL'] = DATABASE_URL
+sys.path.insert(0, ROOT_DIR)
+
+import sqlite_collation  # noqa: E402,F401  (before the first connection)
+
+
+def _create_tables(db):
+    from sqlalchemy.schema import CreateTable
+    from models import ScheduleTeacher
+
+    # Schedule.teacher_name and ScheduleTeacher.name both get an index named
+    # ix_schedule_teacher_name, which SQLite (one index namespace per database) refuses
+    tables = [table for table in db.metadata.sorted_tables if table is not ScheduleTeacher.__table__]
+    db.metadata.create_all(db.engine, tables=tables)
+    with db.engine.begin() as connection:
+        connection.execute(CreateTable(ScheduleTeacher.__table__))
+
+
+@pytest.fixture(scope='session')
+def app():
+    import api
+
+    with api.app.app_context():
+        _create_tables(api.db)
+    yield api.app
+    shutil.rmtree(DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db(app):
+    """The app's db inside an app context; every table and in-process cache is emptied afterwards."""
+    from cache_invalidation import invalidation_bus
+    from db import db as database
+
+    with app.app_context():
+        yield database
+        database.session.rollback()
+        for table in reversed(database.metadata.sorted_tables):
+            database.session.execute(table.delete())
+        database.session.commit()
+        # SQLite reuses the ids of deleted rows, so cached users must not outlive their test
+        for scope in list(invalidation_bus._handlers):
+            invalidation_bus._deliver(scope, None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    """Creates and commits a user; returns (user, Authorization header)."""
+    import api
+    from models import User
+
+    def make(username, role='student', **fields):
+        user = User(username, 'secret1')
+        user.role = role
+        for name, value in fields.items():
+            setattr(user, name, value)
+        db.session.add(user)
+        db.session.commit()
+        return user, {'Authorization': f"Bearer {api.create_token(user.id)}"}
+
+    return make
+
+
+@pytest.fixture
+def poll_now(monkeypatch):
+    """Lets the next request (or poll()) read cache invalidations without waiting for the interval."""
+    from cache_invalidation import invalidation_bus
+
+    def make_due():
+        monkeypatch.setattr(invalidation_bus, '_next_poll', 0)
+
+    return make_due
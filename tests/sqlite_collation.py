@@ -0,0 +1,15 @@
+"""
+Lets the models run on SQLite: they name the MySQL utf8mb4_unicode_ci collation,
+so every SQLite connection gets a plain stand-in for it (see bench_schedule_sync.py).
+
+Importing the module registers the hook for all engines, in this process only;
+tests import it before anything connects, and so do the CLI scripts they start.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@event.listens_for(Engine, 'connect')
+def _register_collation(dbapi_connection, connection_record):
+    if hasattr(dbapi_connection, 'create_collation'):
+        dbapi_connection.create_collation('utf8mb4_unicode_ci', lambda a, b: (a > b) - (a < b))
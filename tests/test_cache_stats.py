@@ -0,0 +1,19 @@
+"""Cache counters: news caches in /api/news/cache-stats, user and teacher caches in /api/cache-stats."""
+
+
+def test_cache_stats_are_split_by_endpoint(db, client, make_user):
+    _, admin_headers = make_user('admin1', is_admin=True)
+
+    general = client.get('/api/cache-stats', headers=admin_headers).get_json()
+    news = client.get('/api/news/cache-stats', headers=admin_headers).get_json()
+
+    assert set(general) == {'auth', 'profiles', 'teacher_index', 'success'}
+    assert {'news_list', 'images', 'circuit_breakers'} <= set(news)
+    assert not {'auth', 'profiles', 'teacher_index'} & set(news)
+
+
+def test_cache_stats_are_for_admins_only(db, client, make_user):
+    _, headers = make_user('student1')
+
+    assert client.get('/api/cache-stats', headers=headers).status_code == 403
+    assert client.get('/api/news/cache-stats', headers=headers).status_code == 403
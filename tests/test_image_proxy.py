@@ -0,0 +1,50 @@
+"""/api/image-proxy only fetches images from the university website and survives unreadable ones."""
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import api
+from image_cache import ImageDiskCache
+from upstream import UpstreamHostError, breaker_stats, is_allowed_url, upstream_get
+
+
+@pytest.mark.parametrize('url', [
+    'https://example.com/logo.png',
+    'https://melsu.ru.example.com/logo.png',
+    'https://melsu.ru@example.com/logo.png',
+])
+def test_image_proxy_rejects_other_hosts(client, url):
+    response = client.get('/api/image-proxy', query_string={'url': url})
+
+    assert response.status_code == 400
+    assert 'example.com' not in [breaker['name'] for breaker in breaker_stats()]
+
+
+def test_upstream_get_refuses_other_hosts():
+    with pytest.raises(UpstreamHostError):
+        upstream_get('https://example.com/news')
+    assert 'example.com' not in [breaker['name'] for breaker in breaker_stats()]
+
+
+def test_melsu_subdomains_are_allowed():
+    assert is_allowed_url('https://melsu.ru/images/a.png')
+    assert is_allowed_url('https://www.melsu.ru/images/a.png')
+    assert not is_allowed_url('ftp://melsu.ru/images/a.png')
+
+
+def test_decompression_bomb_variant_serves_the_original(client, monkeypatch, tmp_path):
+    image_url = 'https://melsu.ru/images/huge.png'
+    original = BytesIO()
+    Image.new('RGB', (100, 100)).save(original, 'PNG')
+    cache = ImageDiskCache(cache_dir=str(tmp_path), max_bytes=10 * 1024 * 1024)
+    cache.put(image_url, original.getvalue(), 'image/png')
+    monkeypatch.setattr(api, 'image_cache', cache)
+    # 100x100 pixels is more than twice the limit, so Pillow raises DecompressionBombError
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+
+    response = client.get('/api/image-proxy', query_string={'url': image_url, 'w': 50})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert response.data == original.getvalue()
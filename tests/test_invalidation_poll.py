@@ -0,0 +1,33 @@
+"""InvalidationBus.poll() delivers every invalidation of its window exactly once."""
+import pytest
+
+from cache_invalidation import invalidation_bus
+from models import CacheInvalidation
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    """Keys delivered to a 'test_scope' handler; the handler is removed after the test."""
+    keys = []
+    monkeypatch.setitem(invalidation_bus._handlers, 'test_scope', [keys.append])
+    return keys
+
+
+def test_poll_delivers_rows_committed_out_of_id_order(db, delivered, poll_now):
+    poll_now()
+    invalidation_bus.poll()
+
+    # A later transaction commits first with a higher id ...
+    db.session.add(CacheInvalidation(id=50, scope='test_scope', key='late-id'))
+    db.session.commit()
+    poll_now()
+    invalidation_bus.poll()
+    # ... then an earlier, longer one commits a lower id
+    db.session.add(CacheInvalidation(id=10, scope='test_scope', key='early-id'))
+    db.session.commit()
+    poll_now()
+    invalidation_bus.poll()
+    poll_now()
+    invalidation_bus.poll()
+
+    assert delivered == ['late-id', 'early-id']
@@ -0,0 +1,63 @@
+"""GET /api/news serves crawled pages from the store and scrapes the rest live."""
+import api
+from models import NewsArticle
+from news_crawler import listing_hash
+
+
+def listing_item(news_id):
+    return {
+        'id': str(news_id),
+        'title': f'Новость {news_id}',
+        'category': 'Новости',
+        'date': '01.09.2024',
+        'description': f'Описание {news_id}',
+        'url': f'https://melsu.ru/news/show/{news_id}',
+        '_debug_original_src': None,
+    }
+
+
+def store_crawled(db, news_ids):
+    for news_id in news_ids:
+        item = listing_item(news_id)
+        db.session.add(NewsArticle(id=news_id, title=item['title'], category=item['category'], date=item['date'],
+                                   description=item['description'], url=item['url'], listing_hash=listing_hash(item)))
+    db.session.commit()
+
+
+def fake_live_listing(monkeypatch, page_size):
+    scraped = []
+
+    def live_news_items(page):
+        scraped.append(page)
+        first = 1000 - (page - 1) * page_size
+        return [listing_item(news_id) for news_id in range(first, first - page_size, -1)], False
+
+    monkeypatch.setattr(api, 'live_news_items', live_news_items)
+    monkeypatch.setitem(api.app.config, 'NEWS_PREFETCH_ENABLED', False)
+    return scraped
+
+
+def test_page_past_partial_store_is_scraped_live(db, client, monkeypatch):
+    page_size = api.app.config['NEWS_PAGE_SIZE']
+    scraped = fake_live_listing(monkeypatch, page_size)
+    store_crawled(db, [1000, 999, 998])
+
+    first_page = client.get('/api/news?page=1').get_json()
+    second_page = client.get('/api/news?page=2').get_json()
+
+    assert [item['id'] for item in first_page['news']] == ['1000', '999', '998']
+    assert first_page['has_next_page'] is True
+    assert len(second_page['news']) == page_size
+    assert second_page['news'][0]['id'] == str(1000 - page_size)
+    assert second_page['has_next_page'] is True
+    assert scraped == [2]
+
+
+def test_empty_store_is_scraped_live(db, client, monkeypatch):
+    scraped = fake_live_listing(monkeypatch, api.app.config['NEWS_PAGE_SIZE'])
+
+    response = client.get('/api/news?page=1')
+
+    assert response.status_code == 200
+    assert response.get_json()['news'][0]['id'] == '1000'
+    assert scraped == [1]
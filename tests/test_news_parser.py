@@ -0,0 +1,29 @@
+"""The lxml news parser returns what the previous BeautifulSoup parser returned."""
+import os
+
+import pytest
+
+import news_parser
+import news_parser_bs4
+from bench_news_parser import compare_outputs, load_fixtures
+from conftest import TESTS_DIR
+
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures', 'news')
+
+
+def test_saved_pages_parse_like_the_old_parser():
+    listings = load_fixtures(FIXTURES_DIR, 'listing')
+    details = load_fixtures(FIXTURES_DIR, 'detail')
+    assert listings and details
+    assert compare_outputs(listings, details) == []
+
+
+@pytest.mark.parametrize('content_html, expected', [
+    ('<p><strong><b>x</b></strong></p>', '**x**'),
+    ('<p><em><i>x</i></em></p>', '_x_'),
+    ('<p><b>a <i>b</i> c</b></p>', '**a _b_ c**'),
+])
+def test_nested_inline_formatting_is_collapsed(content_html, expected):
+    blocks = [{'type': 'text', 'content': expected}]
+    assert news_parser.parse_news_detail_for_mobile(content_html) == blocks
+    assert news_parser_bs4.parse_news_detail_for_mobile(content_html) == blocks
@@ -0,0 +1,40 @@
+"""Teacher accounts created by the provisioning CLI reach the API process's teacher index."""
+import os
+import subprocess
+import sys
+
+from conftest import DATABASE_URL, ROOT_DIR, TESTS_DIR
+from models import CacheInvalidation, Teacher
+
+PROVISIONING_CLI = (
+    "import runpy, sys, sqlite_collation; "
+    "sys.argv = ['teacher_provisioning.py', '--workers', '1']; "
+    "runpy.run_path('teacher_provisioning.py', run_name='__main__')"
+)
+
+
+def run_provisioning_cli():
+    env = dict(os.environ, DATABASE_URL=DATABASE_URL, PYTHONPATH=os.pathsep.join([TESTS_DIR, ROOT_DIR]))
+    result = subprocess.run([sys.executable, '-c', PROVISIONING_CLI], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_provisioning_cli_invalidates_api_teacher_index(db, client, make_user, poll_now):
+    _, headers = make_user('student1')
+    db.session.add(Teacher(name='Петров Пётр Петрович', department='Кафедра ИТ'))
+    db.session.commit()
+    poll_now()
+
+    response = client.get('/api/teachers/search?name=Петров', headers=headers)
+    assert [teacher['has_account'] for teacher in response.get_json()] == [False]
+    db.session.remove()
+
+    output = run_provisioning_cli()
+    assert "'created': 1" in output
+    assert CacheInvalidation.query.filter_by(scope='teachers').count() >= 1
+
+    poll_now()
+    response = client.get('/api/teachers/search?name=Петров', headers=headers)
+    assert [teacher['has_account'] for teacher in response.get_json()] == [True]
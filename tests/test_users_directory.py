@@ -0,0 +1,48 @@
+"""GET /api/users runs a constant number of queries, whatever the number of users."""
+from sqlalchemy import event
+
+from cache_invalidation import invalidation_bus
+from models import Teacher, User
+
+
+def add_users(db, count, start=0):
+    for number in range(start, start + count):
+        student = User(f'student{number}', 'secret1')
+        student.role = 'student'
+        student.group = f'ИВТ-{number % 3}'
+        teacher = User(f'teacher{number}', 'secret1')
+        teacher.role = 'teacher'
+        db.session.add_all([student, teacher])
+        db.session.flush()
+        db.session.add(Teacher(name=f'Преподаватель {number}', department='Кафедра', user_id=teacher.id,
+                               has_account=True))
+    db.session.commit()
+
+
+def count_queries(db, client, headers):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client.get('/api/users', headers=headers)  # warms the token and group caches
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get('/api/users', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(response.get_json()), len(statements)
+
+
+def test_users_query_count_does_not_grow_with_users(db, client, make_user, monkeypatch):
+    monkeypatch.setattr(invalidation_bus, '_next_poll', float('inf'))
+    _, headers = make_user('admin_viewer')
+
+    add_users(db, 10)
+    users, queries = count_queries(db, client, headers)
+    add_users(db, 10, start=10)
+    users_doubled, queries_doubled = count_queries(db, client, headers)
+
+    assert (users, users_doubled) == (20, 40)
+    assert queries_doubled == queries
@@ -0,0 +1,385 @@
+"""
+Shared HTTP session for requests to the university website (melsu.ru).
+
+Keeps keep-alive connections in a pool so that the API does not open a new
+TCP+TLS connection for every proxied image or scraped page, coalesces
+concurrent fetches of the same resource with SingleFlight, and stops calling
+a host that keeps failing with a per-host CircuitBreaker (see upstream_get).
+Only hosts listed in config.UPSTREAM_ALLOWED_HOSTS are ever contacted.
+Prefetcher runs polite background fetches to warm the caches.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://melsu.ru/',
+}
+
+
+def make_session(pool_size=config.UPSTREAM_POOL_SIZE):
+    """Creates a requests.Session with a connection pool of the given size per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(BROWSER_HEADERS)
+    return session
+
+
+# One session per process; requests.Session is safe to share for plain GET requests
+http_session = make_session()
+
+
+class UpstreamHostError(ValueError):
+    """Raised for a URL whose host is not in config.UPSTREAM_ALLOWED_HOSTS."""
+
+
+def is_allowed_url(url):
+    """True for an http(s) URL on one of the allowed hosts or their subdomains."""
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        return False
+    return any(host == allowed or host.endswith(f".{allowed}") for allowed in config.UPSTREAM_ALLOWED_HOSTS)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of contacting a host while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Tracks failures of one upstream host.
+
+    closed    -> requests pass; failure_threshold consecutive failures open the circuit
+    open      -> requests fail fast with CircuitOpenError for reset_timeout seconds
+    half_open -> up to half_open_max_calls trial requests pass; a success closes the
+                 circuit, a failure opens it again
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold, reset_timeout, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_calls = 0
+        self._lock = threading.Lock()
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Returns True if a request may be sent now (reserving a trial slot when half-open)."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_calls = 0
+            if self.state == self.HALF_OPEN:
+                if self._trial_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self._trial_calls += 1
+            return True
+
+    def record_success(self):
+        """Records a healthy response; closes the circuit."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"[circuit {self.name}] Host recovered, closing circuit")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_calls = 0
+
+    def record_failure(self):
+        """Records a failed request; opens the circuit at the threshold or after a failed trial."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"[circuit {self.name}] {self.failures} failures, opening circuit for {self.reset_timeout}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_calls = 0
+
+    def release(self):
+        """Frees a trial slot after a request that says nothing about the host's health."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trial_calls:
+                self._trial_calls -= 1
+
+    def stats(self):
+        """Returns the current state and counters."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """Returns the circuit breaker of the URL's host.
+
+    Breakers are never removed, so the URL must be on an allowed host (see is_allowed_url).
+    """
+    if not is_allowed_url(url):
+        raise UpstreamHostError(f"Host of {url} is not an allowed upstream host")
+    host = urlsplit(url).hostname.lower()
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                failure_threshold=config.UPSTREAM_BREAKER_FAILURES,
+                reset_timeout=config.UPSTREAM_BREAKER_RESET_TIMEOUT,
+                half_open_max_calls=config.UPSTREAM_BREAKER_HALF_OPEN_CALLS,
+            )
+            _breakers[host] = breaker
+        return breaker
+
+
+def breaker_stats():
+    """Returns the state of every host's circuit breaker."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.stats() for breaker in breakers]
+
+
+def upstream_get(url, **kwargs):
+    """GET through the shared session, guarded by the host's circuit breaker.
+
+    Timeouts, connection errors and 5xx/429 responses count as failures. Raises
+    CircuitOpenError (a requests.ConnectionError) without sending anything while
+    the host's circuit is open, and UpstreamHostError for a host that is not allowed.
+    """
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit for {breaker.name} is open, not requesting {url}")
+
+    try:
+        response = http_session.get(url, **kwargs)
+    except (requests.Timeout, requests.ConnectionError):
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+
+    if response.status_code >= 500 or response.status_code == 429:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+class InFlightCall:
+    """One call in progress inside a SingleFlight; followers wait on it."""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Waits for the leader and returns its result (or raises its error).
+
+        Raises TimeoutError if the leader has not finished within timeout seconds.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an in-flight upstream call")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one upstream call.
+
+    The first caller for a key (the leader) does the work, callers arriving while it
+    runs (followers) wait for it and receive the same result or exception. Every
+    follower is one upstream request saved.
+    """
+
+    def __init__(self, name='single-flight', timeout=config.UPSTREAM_COALESCE_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.followers = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def do(self, key, fn):
+        """Returns fn(), sharing one call between concurrent callers with the same key.
+
+        A follower that waits longer than the timeout calls fn() itself.
+        """
+        is_leader, call = self.begin(key)
+        if not is_leader:
+            try:
+                return call.wait(self.timeout)
+            except TimeoutError:
+                with self._lock:
+                    self.timeouts += 1
+                return fn()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result=result)
+        return result
+
+    def begin(self, key):
+        """Registers a caller for key. Returns (is_leader, call).
+
+        A leader must call finish(key) exactly once when the work is done, whatever its outcome.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.followers += 1
+                return False, call
+            call = InFlightCall()
+            self._calls[key] = call
+            self.leaders += 1
+            return True, call
+
+    def finish(self, key, result=None, error=None):
+        """Publishes the leader's result to waiting followers and forgets the key."""
+        with self._lock:
+            call = self._calls.pop(key, None)
+            if error is not None:
+                self.errors += 1
+        if call is not None:
+            call.result = result
+            call.error = error
+            call._done.set()
+
+    def stats(self):
+        """Returns counters; coalesced_calls is the number of upstream calls saved."""
+        with self._lock:
+            requests_total = self.leaders + self.followers
+            return {
+                'name': self.name,
+                'in_flight': len(self._calls),
+                'executed_calls': self.leaders,
+                'coalesced_calls': self.followers,
+                'saved_ratio': round(self.followers / requests_total, 3) if requests_total else None,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+            }
+
+
+class Prefetcher:
+    """Best-effort background fetches with a concurrency cap and a politeness delay.
+
+    Tasks are deduplicated by key: a key that is queued, running or finished less than
+    `remember` seconds ago is not submitted again. When max_pending tasks are waiting,
+    new ones are dropped. Tasks call pace() before each upstream request, which spaces
+    requests from all workers at least `delay` seconds apart.
+    """
+
+    def __init__(self, name, workers, delay, max_pending, remember=600):
+        self.name = name
+        self.delay = delay
+        self.max_pending = max_pending
+        self.remember = remember
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._pending = set()
+        self._recent = OrderedDict()  # key -> finished_at
+        self._next_slot = 0
+        self._lock = threading.Lock()
+        self._pace_lock = threading.Lock()
+
+        self.submitted = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.completed = 0
+        self.errors = 0
+
+    def submit(self, key, fn):
+        """Schedules fn() unless the key is pending or was done recently. Returns True if scheduled."""
+        now = time.monotonic()
+        with self._lock:
+            finished_at = self._recent.get(key)
+            if key in self._pending or (finished_at is not None and now - finished_at < self.remember):
+                self.skipped += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+            self.submitted += 1
+        self._executor.submit(self._run, key, fn)
+        return True
+
+    def pace(self):
+        """Blocks until this worker may send its next upstream request."""
+        with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.delay
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self):
+        """Returns task counters and the current queue size."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'pending': len(self._pending),
+                'submitted': self.submitted,
+                'skipped': self.skipped,
+                'dropped': self.dropped,
+                'completed': self.completed,
+                'errors': self.errors,
+            }
+
+    def _run(self, key, fn):
+        try:
+            fn()
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"[{self.name}] Prefetch of {key} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+                self._recent[key] = time.monotonic()
+                self._recent.move_to_end(key)
+                while len(self._recent) > 10000:
+                    self._recent.popitem(last=False)
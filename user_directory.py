@@ -0,0 +1,119 @@
+"""
+User lists: serialization for the mobile directory (/api/users) and the
+ranked user search shared by the admin panel.
+
+Courses come from the in-memory group catalog and teacher details from one
+IN query for the whole list, instead of two lookups per user.
+"""
+from sqlalchemy import case, func
+
+from db import db
+from group_catalog import group_catalog
+from models import Teacher, User, user_search_index
+
+# Keeps IN (...) lists well below database parameter limits
+LOOKUP_CHUNK_SIZE = 500
+
+# Keys a client may request with fields=; 'id' is always returned (it is the pagination key)
+DIRECTORY_FIELDS = (
+    'id', 'username', 'fullName', 'role', 'verificationStatus',
+    'group', 'faculty', 'speciality', 'course', 'department', 'position',
+)
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def parse_fields(fields_arg):
+    """Parses fields=a,b,c into a set of known directory keys; None means all fields."""
+    if not fields_arg:
+        return None
+    fields = {field.strip() for field in fields_arg.split(',')} & set(DIRECTORY_FIELDS)
+    fields.add('id')
+    return fields
+
+
+def like_prefix(text):
+    """Returns a LIKE pattern matching values that start with text (use with escape='\\')."""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped}%"
+
+
+def apply_user_search(query, search_text):
+    """Restricts a User query to full-text or exact matches of search_text, best first.
+
+    The match is joined onto the query, so role/status filters and pagination apply to
+    every match. Users whose group or username equals the text (case-insensitively)
+    match even without a full-text hit and come first, then the full-text rank.
+    Order the result further (e.g. by created_at) to break ties.
+    """
+    # LOWER() is ASCII-only in SQLite, so the text as typed is compared as well
+    exact = {search_text.strip(), search_text.strip().lower()}
+    group_match = User.group.in_(exact) | func.lower(User.group).in_(exact)
+    username_match = User.username.in_(exact) | func.lower(User.username).in_(exact)
+    exact_match = case((group_match, 0), (username_match, 0), else_=1)
+
+    matches = user_search_index.match_subquery(db.session.connection(), search_text, name='user_match')
+    if matches is None:
+        return query.filter(group_match | username_match).order_by(exact_match)
+    return query.outerjoin(matches, matches.c.id == User.id) \
+        .filter(matches.c.id.isnot(None) | group_match | username_match) \
+        .order_by(exact_match, matches.c.score.desc())
+
+
+def teacher_details(user_ids):
+    """Returns {user_id: (department, position)} for teachers linked to the given users."""
+    details = {}
+    for chunk in _chunks(set(user_ids)):
+        rows = db.session.query(Teacher.user_id, Teacher.department, Teacher.position) \
+            .filter(Teacher.user_id.in_(chunk)) \
+            .order_by(Teacher.id.desc()) \
+            .all()
+        # Lowest teacher id wins when several HR records point to one user, like .first() did
+        details.update((user_id, (department, position)) for user_id, department, position in rows)
+    return details
+
+
+def serialize_directory(users, fields=None):
+    """Serializes users for the directory with a constant number of extra queries.
+
+    fields (see parse_fields) limits the keys of every item; teacher details are not
+    queried when neither department nor position is requested.
+    """
+    if fields is None or fields & {'department', 'position'}:
+        teachers = teacher_details(user.id for user in users if user.role == 'teacher')
+    else:
+        teachers = {}
+
+    result = []
+    for user in users:
+        user_data = {
+            'id': user.id,
+            'username': user.username,
+            'fullName': user.full_name,
+            'role': user.role,
+            'verificationStatus': user.verification_status or 'verified'
+        }
+        if user.role == 'student':
+            user_data['group'] = user.group
+            user_data['faculty'] = user.faculty
+            user_data['speciality'] = {
+                'id': user.speciality_id,
+                'code': user.speciality_code,
+                'name': user.speciality_name,
+                'form': user.study_form,
+                'formName': user.study_form_name
+            } if user.speciality_id else None
+            course = group_catalog.course_of(user.group)
+            if course is not None:
+                user_data['course'] = course
+        elif user.role == 'teacher':
+            if user.id in teachers:
+                user_data['department'], user_data['position'] = teachers[user.id]
+        if fields is not None:
+            user_data = {key: value for key, value in user_data.items() if key in fields}
+        result.append(user_data)
+    return result
@@ -0,0 +1,70 @@
+"""
+Allocation of free logins for new and regenerated accounts.
+
+Instead of probing "base", "base1", "base2", ... one query at a time, all taken
+logins starting with the base are fetched with a single indexed LIKE 'base%'
+query and the first free suffix is picked in memory. A concurrent registration
+can still take the same login between the check and the INSERT; callers that
+commit through save_with_unique_username() retry once with a fresh allocation.
+"""
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import User
+from user_directory import like_prefix
+
+
+def taken_usernames(base):
+    """Returns the lowercase logins that start with base (one query)."""
+    rows = db.session.query(User.username).filter(User.username.like(like_prefix(base), escape='\\')).all()
+    return {username.lower() for (username,) in rows}
+
+
+def first_free_username(base, taken, max_suffix=None):
+    """Returns base, or base with the lowest free numeric suffix; None if all suffixes up to max_suffix are taken."""
+    if base.lower() not in taken:
+        return base
+    suffix = 1
+    while f"{base}{suffix}".lower() in taken:
+        suffix += 1
+        if max_suffix is not None and suffix > max_suffix:
+            return None
+    return f"{base}{suffix}"
+
+
+def allocate_username(base_usernames, max_suffix=None, fallback=None):
+    """Returns a free login derived from the first base that has one.
+
+    base_usernames is tried in order (one query per base, usually only the first);
+    when none of them has a free suffix up to max_suffix, fallback() provides a new base.
+    """
+    for base in base_usernames:
+        if not base:
+            continue
+        username = first_free_username(base, taken_usernames(base), max_suffix)
+        if username:
+            return username
+
+    base = fallback() if fallback else 'user'
+    return first_free_username(base, taken_usernames(base))
+
+
+def save_with_unique_username(base_usernames, apply, max_suffix=None, fallback=None):
+    """Allocates a login, calls apply(username) to stage the changes and commits.
+
+    If the commit hits a unique-constraint race the session is rolled back and the
+    allocation is retried once; apply must therefore set every change it needs again.
+    Returns the login that was saved.
+    """
+    for attempt in range(2):
+        username = allocate_username(base_usernames, max_suffix=max_suffix, fallback=fallback)
+        try:
+            apply(username)
+            db.session.commit()
+            return username
+        except IntegrityError:
+            db.session.rollback()
+            # Only a login collision is worth a retry (the constraint may be on another column)
+            if attempt or username.lower() not in taken_usernames(username):
+                raise
+            print(f"Username {username} was taken concurrently, allocating another one")